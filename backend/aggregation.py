@@ -0,0 +1,382 @@
+from bisect import bisect_left
+from itertools import accumulate
+
+import numpy as np
+import pandas as pd
+
+import hyperloglog
+
+# ---------------- Aggregation ----------------
+# Summary and per-instructor stats over processed rows (the ``all_data`` shape).
+# Both come from running aggregates, which are persisted with the checkpoint
+# under "aggregates". A refresh then only applies the rows that were added,
+# removed or changed instead of re-reading every row:
+#   {"version": 2, "total": bucket, "instructors": {"Supriya": bucket, ...}}
+# A bucket holds response/sentiment/flagged counts, the rating total, the sum
+# and count of valid (> 0) ratings, and the sentiment score sum, mean and
+# Welford M2 (for its variance). Full builds use one grouped NumPy pass over
+# typed columns; deltas are applied row by row.
+# Distributions are kept as fixed-bin counts: "rating_counts" for whole 1-5
+# ratings and "score_hist" for the sentiment score over [-1, 1] in SCORE_BINS
+# equal bins. Unlike t-digest or KLL sketches these support removing rows, so
+# refreshes can still apply deltas, and they merge across sheets by addition.
+# Quantiles read from the histogram are within one bin width (0.02) of exact.
+# "students" is a HyperLogLog sketch (see hyperloglog.py) of the respondents,
+# keyed on the normalized email or, failing that, the student name. Sketches
+# merge across sheets but cannot forget a student, so added rows are folded in
+# and removals rebuild every sketch from the current rows.
+# A blank instructor cell (None / NaN from a CSV) is grouped under "", as the
+# per-row path always did for a missing column.
+AGGREGATES_VERSION = 4
+SENTIMENTS = ("positive", "negative", "neutral")
+BUCKET_FIELDS = ("responses", "positive", "negative", "neutral", "flagged", "rating_total",
+                 "rating_sum", "valid_ratings", "score_sum", "score_mean", "score_m2")
+COUNT_FIELDS = ("responses", "positive", "negative", "neutral", "flagged", "valid_ratings")
+RATING_LEVELS = (1, 2, 3, 4, 5)
+SCORE_BINS = 100
+SKETCH_FIELDS = {"rating_counts": len(RATING_LEVELS), "score_hist": SCORE_BINS}
+QUANTILES = (0.1, 0.5, 0.9)
+
+def _empty_bucket() -> dict:
+    bucket = {name: 0 if name in COUNT_FIELDS else 0.0 for name in BUCKET_FIELDS}
+    bucket.update({name: [0] * size for name, size in SKETCH_FIELDS.items()})
+    bucket["students"] = ""
+    return bucket
+
+def instructor_name(value):
+    """Aggregate key for an instructor cell ("" when it is blank)"""
+    return "" if pd.isna(value) else value
+
+def _instructor_names(values) -> np.ndarray:
+    return pd.Series(np.asarray(values, dtype=object), dtype=object).fillna("").to_numpy(dtype=object)
+
+def student_key(row: dict):
+    """Normalized email, else student name, identifying a respondent (None if neither is set)"""
+    for field in ("email", "student_name"):
+        value = str(row.get(field) or "").strip().lower()
+        if value:
+            return value
+    return None
+
+def _normalized(values) -> np.ndarray:
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), sort=False)
+    # Code -1 (missing) picks the trailing ""
+    return np.array([str(value).strip().lower() for value in uniques] + [""], dtype=object)[codes]
+
+def student_keys(rows: list) -> np.ndarray:
+    """student_key for every row, normalizing each distinct email / name once"""
+    if not rows:
+        return np.empty(0, dtype=object)
+    emails = _normalized([row.get("email") for row in rows])
+    names = _normalized([row.get("student_name") for row in rows])
+    keys = np.where(emails != "", emails, names)
+    keys[keys == ""] = None
+    return keys
+
+def _student_sketches(codes: np.ndarray, groups: int, students) -> tuple:
+    """(total sketch, sketch per instructor code) for rows with a student key"""
+    keys = np.asarray(students, dtype=object)
+    known = pd.notna(keys)
+    # Hash each distinct student once
+    key_codes, uniques = pd.factorize(keys[known], sort=False)
+    hashes = hyperloglog.hash_keys(uniques)[key_codes]
+    registers = hyperloglog.grouped_registers(codes[known], groups, hashes)
+    return hyperloglog.encode(registers.max(axis=0)), [hyperloglog.encode(row) for row in registers]
+
+def _score_bin(score: float) -> int:
+    return min(SCORE_BINS - 1, max(0, int((score + 1) / 2 * SCORE_BINS)))
+
+def _rating_level(rating):
+    """Index into rating_counts for a whole 1-5 rating, else None"""
+    return int(rating) - 1 if rating in RATING_LEVELS else None
+
+def _add(bucket: dict, row: dict):
+    bucket["responses"] += 1
+    bucket[row["sentiment"]] += 1
+    bucket["flagged"] += 1 if row.get("is_flagged") else 0
+    bucket["rating_total"] += row["rating"]
+    if row["rating"] > 0:
+        bucket["rating_sum"] += row["rating"]
+        bucket["valid_ratings"] += 1
+    level = _rating_level(row["rating"])
+    if level is not None:
+        bucket["rating_counts"][level] += 1
+    # Welford's update for the sentiment score mean / variance
+    score = row.get("sentiment_score", 0.0)
+    bucket["score_hist"][_score_bin(score)] += 1
+    bucket["score_sum"] += score
+    delta = score - bucket["score_mean"]
+    bucket["score_mean"] += delta / bucket["responses"]
+    bucket["score_m2"] += delta * (score - bucket["score_mean"])
+
+def _remove(bucket: dict, row: dict):
+    bucket["responses"] -= 1
+    bucket[row["sentiment"]] -= 1
+    bucket["flagged"] -= 1 if row.get("is_flagged") else 0
+    bucket["rating_total"] -= row["rating"]
+    if row["rating"] > 0:
+        bucket["rating_sum"] -= row["rating"]
+        bucket["valid_ratings"] -= 1
+    level = _rating_level(row["rating"])
+    if level is not None:
+        bucket["rating_counts"][level] -= 1
+    score = row.get("sentiment_score", 0.0)
+    bucket["score_hist"][_score_bin(score)] -= 1
+    bucket["score_sum"] -= score
+    if bucket["responses"] == 0:
+        bucket.update(rating_total=0.0, rating_sum=0.0, score_sum=0.0, score_mean=0.0, score_m2=0.0)
+        return
+    # Welford's update run backwards
+    delta = score - bucket["score_mean"]
+    bucket["score_mean"] -= delta / bucket["responses"]
+    bucket["score_m2"] = max(0.0, bucket["score_m2"] - delta * (score - bucket["score_mean"]))
+
+def aggregate_columns(instructors, sentiments, ratings, scores=None, flags=None, students=None) -> dict:
+    """Aggregate state from column arrays in one grouped pass (instructors keep first-seen order)
+
+    Instructors are factorized to integer codes and every per-instructor sum is
+    an np.bincount over those codes, which is a NumPy groupby-sum.
+    """
+    if len(instructors) == 0:
+        return empty_aggregates()
+    codes, names = pd.factorize(_instructor_names(instructors), sort=False)
+    groups = len(names)
+
+    def per_instructor(weights=None):
+        return np.bincount(codes, weights=weights, minlength=groups)
+
+    def per_instructor_bins(bins, size, mask):
+        # One bincount over (instructor, bin) pairs, reshaped to a row of counts per instructor
+        flat = (codes * size + bins)[mask]
+        return np.bincount(flat, minlength=groups * size).reshape(groups, size)
+
+    ratings = pd.to_numeric(pd.Series(ratings), errors="coerce").fillna(0).to_numpy(dtype="float64")
+    valid = ratings > 0
+    sentiment_codes = pd.Categorical(sentiments, categories=SENTIMENTS).codes
+    score = np.asarray(scores, dtype="float64") if scores is not None else np.zeros(len(codes))
+    flagged = np.asarray(flags, dtype=bool) if flags is not None else np.zeros(len(codes), dtype=bool)
+
+    columns = {
+        "responses": per_instructor(),
+        "flagged": per_instructor(flagged.astype("float64")),
+        "rating_total": per_instructor(ratings),
+        "rating_sum": per_instructor(np.where(valid, ratings, 0.0)),
+        "valid_ratings": per_instructor(valid.astype("float64")),
+        "score_sum": per_instructor(score),
+    }
+    for position, sentiment in enumerate(SENTIMENTS):
+        columns[sentiment] = per_instructor((sentiment_codes == position).astype("float64"))
+    columns["score_mean"] = columns["score_sum"] / columns["responses"]
+    columns["score_m2"] = per_instructor((score - columns["score_mean"][codes]) ** 2)
+    whole = (ratings == np.floor(ratings)) & (ratings >= RATING_LEVELS[0]) & (ratings <= RATING_LEVELS[-1])
+    columns["rating_counts"] = per_instructor_bins(
+        np.where(whole, ratings - RATING_LEVELS[0], 0).astype("int64"), len(RATING_LEVELS), whole)
+    score_bins = np.clip(((score + 1) / 2 * SCORE_BINS).astype("int64"), 0, SCORE_BINS - 1)
+    columns["score_hist"] = per_instructor_bins(score_bins, SCORE_BINS, np.ones(len(codes), dtype=bool))
+
+    total = {name: values.sum(axis=0) for name, values in columns.items()}
+    total["score_mean"] = total["score_sum"] / total["responses"]
+    total["score_m2"] = float(((score - total["score_mean"]) ** 2).sum())
+    sketches = [""] * groups
+    if students is not None:
+        total["students"], sketches = _student_sketches(codes, groups, students)
+    return {
+        "version": AGGREGATES_VERSION,
+        "total": _bucket(total),
+        "instructors": {
+            name: _bucket({field: values[position] for field, values in columns.items()}, sketches[position])
+            for position, name in enumerate(names)
+        },
+    }
+
+def _bucket(values: dict, students: str = None) -> dict:
+    bucket = {name: (int(values[name]) if name in COUNT_FIELDS else float(values[name])) for name in BUCKET_FIELDS}
+    bucket.update({name: [int(count) for count in values[name]] for name in SKETCH_FIELDS})
+    bucket["students"] = values.get("students", "") if students is None else students
+    return bucket
+
+def _copy_bucket(bucket: dict) -> dict:
+    return {name: (list(value) if isinstance(value, list) else value) for name, value in bucket.items()}
+
+def empty_aggregates() -> dict:
+    return {"version": AGGREGATES_VERSION, "total": _empty_bucket(), "instructors": {}}
+
+def aggregates_match(aggregates, rows: list) -> bool:
+    """Whether stored aggregates are in the current format and cover exactly these rows"""
+    return (isinstance(aggregates, dict) and aggregates.get("version") == AGGREGATES_VERSION
+            and aggregates["total"]["responses"] == len(rows))
+
+def apply_rows(aggregates: dict, added: list = (), removed: list = (), rows: list = None) -> dict:
+    """Apply row deltas to aggregates in place
+
+    ``rows`` are all rows after the change; when rows were removed the student
+    sketches are rebuilt from them (without them the sketches keep counting
+    removed students).
+    """
+    instructors = aggregates["instructors"]
+    for row in removed:
+        _remove(aggregates["total"], row)
+        name = instructor_name(row["instructor"])
+        bucket = instructors.get(name)
+        if bucket is not None:
+            _remove(bucket, row)
+            if bucket["responses"] <= 0:
+                del instructors[name]
+    for row in added:
+        _add(aggregates["total"], row)
+        _add(instructors.setdefault(instructor_name(row["instructor"]), _empty_bucket()), row)
+
+    if removed and rows is not None:
+        _rebuild_students(aggregates, rows)
+    else:
+        _add_students(aggregates, added)
+    return aggregates
+
+def _add_students(aggregates: dict, rows: list):
+    """Fold rows' students into the sketches, one decode/encode per touched bucket"""
+    keys = {}
+    for row in rows:
+        key = student_key(row)
+        if key is not None:
+            keys.setdefault(instructor_name(row["instructor"]), []).append(key)
+    if not keys:
+        return
+    for instructor, names in keys.items():
+        bucket = aggregates["instructors"][instructor]
+        bucket["students"] = hyperloglog.add(bucket["students"], hyperloglog.hash_keys(names))
+    total = aggregates["total"]
+    total["students"] = hyperloglog.merge(
+        [total["students"]] + [aggregates["instructors"][instructor]["students"] for instructor in keys])
+
+def _rebuild_students(aggregates: dict, rows: list):
+    codes, names = pd.factorize(_instructor_names([row["instructor"] for row in rows]), sort=False)
+    total, sketches = _student_sketches(codes, len(names), student_keys(rows))
+    aggregates["total"]["students"] = total
+    for name, sketch in zip(names, sketches):
+        if name in aggregates["instructors"]:
+            aggregates["instructors"][name]["students"] = sketch
+
+def build_aggregates(rows: list) -> dict:
+    """Aggregates for rows from scratch"""
+    return aggregate_columns(
+        [row["instructor"] for row in rows],
+        [row["sentiment"] for row in rows],
+        [row["rating"] for row in rows],
+        [row.get("sentiment_score", 0.0) for row in rows],
+        [bool(row.get("is_flagged")) for row in rows],
+        student_keys(rows),
+    )
+
+def copy_aggregates(aggregates: dict) -> dict:
+    return {
+        "version": aggregates["version"],
+        "total": _copy_bucket(aggregates["total"]),
+        "instructors": {name: _copy_bucket(bucket) for name, bucket in aggregates["instructors"].items()},
+    }
+
+def merge_buckets(buckets) -> dict:
+    """One bucket for the union of several (e.g. one sheet's total per campus)"""
+    buckets = list(buckets)
+    merged = _empty_bucket()
+    for bucket in buckets:
+        if not bucket["responses"]:
+            continue
+        # Chan et al.'s pairwise combination of the score mean / M2
+        responses = merged["responses"] + bucket["responses"]
+        delta = bucket["score_mean"] - merged["score_mean"]
+        merged["score_m2"] += bucket["score_m2"] + delta * delta * merged["responses"] * bucket["responses"] / responses
+        merged["score_mean"] += delta * bucket["responses"] / responses
+        for name in BUCKET_FIELDS:
+            if name not in ("score_mean", "score_m2"):
+                merged[name] += bucket[name]
+        for name in SKETCH_FIELDS:
+            merged[name] = [a + b for a, b in zip(merged[name], bucket[name])]
+    merged["students"] = hyperloglog.merge(bucket.get("students", "") for bucket in buckets)
+    return merged
+
+def row_key(row: dict) -> str:
+    """Identity of a feedback response across refreshes (timestamp + student + instructor)"""
+    return f"{row.get('timestamp', '')}_{row.get('student_name', '')}_{row.get('instructor', '')}"
+
+def diff_rows(old_rows: list, new_rows: list):
+    """(added, removed) rows between two versions of a sheet; a changed row is removed and re-added"""
+    unmatched = {}
+    for row in old_rows:
+        unmatched.setdefault(row_key(row), []).append(row)
+    added = []
+    for row in new_rows:
+        candidates = unmatched.get(row_key(row))
+        if candidates and row in candidates:
+            candidates.remove(row)
+        else:
+            added.append(row)
+    removed = [row for candidates in unmatched.values() for row in candidates]
+    return added, removed
+
+def histogram_quantiles(counts: list, quantiles=QUANTILES) -> dict:
+    """Approximate sentiment score quantiles ({"p10": ..., "p50": ..., "p90": ...}) from a score histogram"""
+    cumulative = list(accumulate(counts))
+    total = cumulative[-1]
+    result = {}
+    for q in quantiles:
+        label = f"p{round(q * 100)}"
+        if not total:
+            result[label] = None
+            continue
+        # Interpolate within the bin holding the q-th observation
+        target = q * total
+        position = bisect_left(cumulative, target)
+        seen = cumulative[position - 1] if position else 0
+        fraction = (target - seen) / counts[position]
+        result[label] = round(-1 + (position + fraction) * 2 / SCORE_BINS, 3)
+    return result
+
+def rating_distribution(counts: list) -> dict:
+    """Responses per whole rating, {"1": n, ..., "5": n}"""
+    return {str(level): count for level, count in zip(RATING_LEVELS, counts)}
+
+def summary_from_aggregates(aggregates: dict) -> dict:
+    """The summary block, straight from aggregate state"""
+    total = aggregates["total"]
+    average_rating = total["rating_sum"] / total["valid_ratings"] if total["valid_ratings"] > 0 else 0
+    return {
+        "total_responses": total["responses"],
+        "negative_count": total["negative"],
+        "positive_count": total["positive"],
+        "neutral_count": total["neutral"],
+        "average_rating": round(average_rating, 2),
+        "rating_distribution": rating_distribution(total["rating_counts"]),
+        "sentiment_quantiles": histogram_quantiles(total["score_hist"]),
+        "unique_respondents": min(hyperloglog.estimate(total["students"]), total["responses"]),
+        "unique_respondents_error": hyperloglog.STANDARD_ERROR,
+    }
+
+def instructor_stats_from_aggregates(aggregates: dict) -> list:
+    """Per-instructor stats from aggregate state, most negative feedback first"""
+    formatted_instructor_stats = []
+    for instructor, stats in aggregates["instructors"].items():
+        avg_rating = stats["rating_sum"] / stats["valid_ratings"] if stats["valid_ratings"] > 0 else 0
+        avg_sentiment = stats["score_sum"] / stats["responses"] if stats["responses"] else 0
+        variance = stats["score_m2"] / (stats["responses"] - 1) if stats["responses"] > 1 else 0.0
+        formatted_instructor_stats.append({
+            "instructor": instructor,
+            "total_responses": stats["responses"],
+            "average_rating": round(avg_rating, 2),
+            "negative_count": stats["negative"],
+            "sentiment_score": round(avg_sentiment, 3),
+            "sentiment_stddev": round(variance ** 0.5, 3),
+            "sentiment_quantiles": histogram_quantiles(stats["score_hist"]),
+            "rating_distribution": rating_distribution(stats["rating_counts"]),
+            "unique_students": min(hyperloglog.estimate(stats["students"]), stats["responses"]),
+        })
+
+    formatted_instructor_stats.sort(key=lambda x: (-x["negative_count"], x["average_rating"]))
+    return formatted_instructor_stats
+
+def build_summary(rows: list) -> dict:
+    """Overall counts and average rating"""
+    return summary_from_aggregates(build_aggregates(rows))
+
+def build_instructor_stats(rows: list) -> list:
+    """Per-instructor stats, most negative feedback first"""
+    return instructor_stats_from_aggregates(build_aggregates(rows))
@@ -2,11 +2,14 @@ import json
 import requests
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+from serialization import install_flask_json
+from aggregation import aggregate_columns, SENTIMENTS
 import re
 from datetime import datetime
 from collections import Counter
 
 app = Flask(__name__)
+install_flask_json(app)
 CORS(app)  # Enable CORS for frontend access
 
 def analyze_sentiment(text):
@@ -106,8 +109,6 @@ def process_sheets():
         # Process each entry
         processed_data = []
         negative_entries = []
-        instructor_stats = {}
-        sentiment_distribution = {"positive": 0, "negative": 0, "neutral": 0}
         
         for entry in sheets_data:
             # Extract relevant fields
@@ -147,26 +148,25 @@ def process_sheets():
             # Track negative entries
             if processed_entry["is_flagged"]:
                 negative_entries.append(processed_entry)
-            
-            # Update sentiment distribution
-            sentiment_distribution[sentiment_result["sentiment"]] += 1
-            
-            # Update instructor stats
-            if instructor not in instructor_stats:
-                instructor_stats[instructor] = {
-                    "total_feedback": 0,
-                    "average_rating": 0,
-                    "positive_count": 0,
-                    "negative_count": 0,
-                    "neutral_count": 0,
-                    "total_rating": 0
-                }
-            
-            stats = instructor_stats[instructor]
-            stats["total_feedback"] += 1
-            stats["total_rating"] += rating
-            stats["average_rating"] = round(stats["total_rating"] / stats["total_feedback"], 2)
-            stats[f"{sentiment_result['sentiment']}_count"] += 1
+        
+        # Sentiment distribution and instructor stats in one grouped pass
+        aggregates = aggregate_columns(
+            [entry["instructor"] for entry in processed_data],
+            [entry["sentiment"] for entry in processed_data],
+            [entry["rating"] for entry in processed_data],
+        )
+        sentiment_distribution = {sentiment: aggregates["total"][sentiment] for sentiment in SENTIMENTS}
+        instructor_stats = {
+            instructor: {
+                "total_feedback": stats["responses"],
+                "average_rating": round(stats["rating_total"] / stats["responses"], 2),
+                "positive_count": stats["positive"],
+                "negative_count": stats["negative"],
+                "neutral_count": stats["neutral"],
+                "total_rating": stats["rating_total"]
+            }
+            for instructor, stats in aggregates["instructors"].items()
+        }
         
         # Calculate percentages for sentiment distribution
         total_entries = len(processed_data)
@@ -189,7 +189,7 @@ def process_sheets():
                 "total_feedback": total_entries,
                 "flagged_feedback": len(negative_entries),
                 "instructors_count": len(instructor_stats),
-                "average_overall_rating": round(sum(entry["rating"] for entry in processed_data) / total_entries, 2) if total_entries > 0 else 0
+                "average_overall_rating": round(aggregates["total"]["rating_total"] / total_entries, 2) if total_entries > 0 else 0
             }
         }
         
@@ -0,0 +1,386 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+from checkpoint_store import read_checkpoint
+
+# Manual benchmarks run against the checkpoint files in CHECKPOINT_DIR.
+# Usage: python benchmarks.py <benchmark> [--iterations N]
+CHECKPOINT_DIR = "checkpoints"
+
+def load_sample_checkpoint():
+    """Load the largest checkpoint on disk as a realistic payload"""
+    files = sorted(glob.glob(os.path.join(CHECKPOINT_DIR, "checkpoint_*.json")), key=os.path.getsize)
+    if not files:
+        sys.exit(f"No checkpoints found in {CHECKPOINT_DIR}")
+    return files[-1], read_checkpoint(files[-1])
+
+def report(label: str, iterations: int, elapsed: float):
+    print(f"{label:<40} {iterations / elapsed:>10.1f} req/s  {elapsed / iterations * 1000:>8.2f} ms/req")
+
+def bench_cached_feedback(iterations: int):
+    """Cached /feedback loads: re-serializing the dict vs serving cached bytes"""
+    from fastapi import FastAPI, Request, Response
+    from fastapi.testclient import TestClient
+    from response_cache import store_cached_response, get_cached_response, response_payload
+
+    path, data = load_sample_checkpoint()
+    version = "bench"
+    store_cached_response("bench", version, data)
+
+    app = FastAPI()
+
+    @app.get("/before")
+    def before():
+        cached = read_checkpoint(path)
+        cached["processing_info"]["cache_status"] = "cached"
+        return cached
+
+    @app.get("/after")
+    def after(request: Request):
+        entry = get_cached_response("bench", version)
+        body, headers = response_payload(entry, request.headers.get("accept-encoding", ""))
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    client = TestClient(app)
+    for label, url, headers in [
+        ("before (load + serialize)", "/before", {"Accept-Encoding": "identity"}),
+        ("after (cached bytes)", "/after", {"Accept-Encoding": "identity"}),
+        ("after (cached gzip bytes)", "/after", {"Accept-Encoding": "gzip"}),
+    ]:
+        client.get(url, headers=headers)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            client.get(url, headers=headers)
+        report(label, iterations, time.perf_counter() - start)
+
+def bench_async_load(iterations: int):
+    """Latency of /health and cached /feedback reads while cold refreshes run
+
+    Needs GOOGLE_SERVICE_ACCOUNT_JSON to import main_git; the sheet itself is
+    replaced by the sample checkpoint's rows behind a simulated network delay.
+    """
+    import asyncio
+    import statistics
+    import httpx
+    import main_git
+
+    path, data = load_sample_checkpoint()
+    sheet_id = os.path.basename(path)[len("checkpoint_"):-len(".json")]
+    os.utime(path)  # cached reads need a fresh checkpoint
+    header = ["Timestamp", "Email Address", "Student Name", "How do you feel about the session",
+              "Select the Instructor", "How do you rate Session", "Anything you want to convey"]
+    values = [header] + [
+        [row["timestamp"], row["email"], row["student_name"], row["session_feedback"], row["instructor"],
+         str(int(row["rating"])), row["additional_comments"]]
+        for row in data["all_data"][:300]
+    ]
+
+    class Worksheet:
+        def get_all_values(self):
+            time.sleep(0.5)  # Google Sheets round trip
+            return values
+
+    class Spreadsheet:
+        sheet1 = Worksheet()
+
+    class Client:
+        def open_by_key(self, key):
+            return Spreadsheet()
+
+    main_git.client = Client()
+    refreshes = 48  # more than Starlette's 40 default threadpool tokens
+
+    async def timed(client, url):
+        start = time.perf_counter()
+        response = await client.get(url)
+        response.raise_for_status()
+        return (time.perf_counter() - start) * 1000
+
+    async def run():
+        transport = httpx.ASGITransport(app=main_git.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            await client.get(f"/feedback/{sheet_id}?view=summary")
+            cold = [asyncio.create_task(client.get(f"/feedback/bench_cold_{i}?force_refresh=true"))
+                    for i in range(refreshes)]
+            await asyncio.sleep(0.05)
+            health, cached, filtered, rows = [], [], [], []
+            for _ in range(iterations):
+                health.append(await timed(client, "/health"))
+                cached.append(await timed(client, f"/feedback/{sheet_id}?view=summary"))
+                # Filtering runs on the CPU pool, which scoring for the refreshes never uses
+                filtered.append(await timed(client, f"/feedback/{sheet_id}?view=summary&sentiment=negative"))
+                rows.append(await timed(client, f"/feedback/{sheet_id}/rows?limit=5"))
+            start = time.perf_counter()
+            await asyncio.gather(*cold)
+            return health, cached, filtered, rows, time.perf_counter() - start
+
+    health, cached, filtered, rows, remaining = asyncio.run(run())
+    main_git.flush_writes(timeout=60)
+    for name in os.listdir(CHECKPOINT_DIR):
+        if name.startswith("checkpoint_bench_cold_"):
+            os.remove(os.path.join(CHECKPOINT_DIR, name))
+    print(f"{refreshes} cold refreshes of {len(values) - 1} rows in flight")
+    for label, samples in [("/health", health), ("cached /feedback?view=summary", cached),
+                           ("cached filtered /feedback", filtered), ("cached /feedback/{id}/rows?limit=5", rows)]:
+        print(f"{label:<40} p50 {statistics.median(samples):>8.2f} ms  max {max(samples):>8.2f} ms")
+    print(f"{'cold refreshes still running after reads':<40} {remaining:>8.2f} s")
+
+def bench_aggregation(iterations: int):
+    """Summary + instructor stats over 1M rows: per-row dict updates vs one groupby, with a parity check"""
+    from aggregation import (
+        build_aggregates, apply_rows, empty_aggregates, summary_from_aggregates, instructor_stats_from_aggregates,
+    )
+
+    _, data = load_sample_checkpoint()
+    sample = data["all_data"]
+    rows = (sample * (1_000_000 // len(sample) + 1))[:1_000_000]
+    print(f"{len(rows):,} rows, {len(data['instructor_stats'])} instructors")
+
+    cases = [
+        ("per-row loop (apply_rows)", lambda: apply_rows(empty_aggregates(), added=rows)),
+        ("groupby (build_aggregates)", lambda: build_aggregates(rows)),
+    ]
+    results = []
+    for label, fn in cases:
+        start = time.perf_counter()
+        for _ in range(max(1, iterations // 10)):
+            aggregates = fn()
+        elapsed = (time.perf_counter() - start) / max(1, iterations // 10)
+        results.append(aggregates)
+        print(f"{label:<40} {elapsed * 1000:>10.1f} ms")
+
+    loop, grouped = results
+    same_summary = summary_from_aggregates(loop) == summary_from_aggregates(grouped)
+    same_stats = instructor_stats_from_aggregates(loop) == instructor_stats_from_aggregates(grouped)
+    sample_summary = summary_from_aggregates(build_aggregates(sample))
+    same_sample = {key: sample_summary[key] for key in data["summary"]} == data["summary"]
+    # Blank instructor cells (None / NaN from a CSV) group under "" on both paths
+    blank = [dict(row, instructor=None if position % 3 else float("nan")) if position % 7 == 0 else row
+             for position, row in enumerate(sample)]
+    same_blank = (instructor_stats_from_aggregates(apply_rows(empty_aggregates(), added=blank))
+                  == instructor_stats_from_aggregates(build_aggregates(blank)))
+    print(f"parity: summary {same_summary}, instructor_stats {same_stats}, sample checkpoint summary {same_sample}, "
+          f"blank instructors {same_blank}")
+    if not (same_summary and same_stats and same_sample and same_blank):
+        sys.exit("aggregation parity check failed")
+
+def bench_trends(iterations: int):
+    """Weekly per-instructor series: reducing raw rows per request vs summing rollup cells, with a parity check"""
+    from collections import Counter
+    from feedback_index import parse_datetime
+    from rollups import build_rollups, trend_series, week_key
+
+    _, data = load_sample_checkpoint()
+    rows = data["all_data"]
+
+    def from_rows():
+        counts = Counter()
+        for row in rows:
+            moment = parse_datetime(row["timestamp"])
+            if moment is not None:
+                counts[(week_key(moment), row["instructor"])] += 1
+        return counts
+
+    start = time.perf_counter()
+    rollups = build_rollups(rows)
+    print(f"{len(rows):,} rows -> {len(rollups['day'])} day / {len(rollups['week'])} week periods, "
+          f"built in {(time.perf_counter() - start) * 1000:.1f} ms")
+    cases = [
+        ("raw rows per request", from_rows),
+        ("rollup cells (trend_series)", lambda: trend_series(rollups, "week", by_instructor=True)),
+    ]
+    for label, fn in cases:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - start
+        print(f"{label:<40} {elapsed / iterations * 1000:>8.2f} ms")
+
+    summed = Counter({(point["period"], name): cell["responses"]
+                      for point in trend_series(rollups, "week", by_instructor=True)
+                      for name, cell in point["instructors"].items()})
+    print(f"parity: {summed == from_rows()}")
+    if summed != from_rows():
+        sys.exit("trends parity check failed")
+
+def bench_distinct_students(iterations: int):
+    """Unique respondents per instructor: exact sets over rows vs merging HyperLogLog sketches, with error bounds"""
+    import hyperloglog
+    from aggregation import build_aggregates, merge_buckets, student_key
+
+    _, data = load_sample_checkpoint()
+    rows = data["all_data"] * 20
+    aggregates = build_aggregates(rows)
+
+    def exact():
+        students = {}
+        for row in rows:
+            key = student_key(row)
+            if key is not None:
+                students.setdefault(row["instructor"], set()).add(key)
+        return {name: len(keys) for name, keys in students.items()}
+
+    def sketched():
+        return {name: hyperloglog.estimate(bucket["students"]) for name, bucket in aggregates["instructors"].items()}
+
+    cases = [("exact sets over rows", exact), ("sketch estimates", sketched),
+             ("sheet-wide sketch merge", lambda: hyperloglog.estimate(merge_buckets(aggregates["instructors"].values())["students"]))]
+    print(f"{len(rows):,} rows, {len(aggregates['instructors'])} instructors, "
+          f"{len(aggregates['total']['students'])} sketch bytes for the sheet")
+    for label, fn in cases:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - start
+        print(f"{label:<40} {elapsed / iterations * 1000:>8.2f} ms")
+
+    counts, estimates = exact(), sketched()
+    worst = max(abs(estimates[name] - count) / count for name, count in counts.items())
+    print(f"worst relative error {worst:.3f} (standard error {hyperloglog.STANDARD_ERROR})")
+    if worst > 3 * hyperloglog.STANDARD_ERROR:
+        sys.exit("distinct-students error check failed")
+
+def bench_checkpoint_size(iterations: int):
+    """Stored checkpoint with flagged_entries copies vs flagged_row_ids, with a compat-shape parity check"""
+    import gzip
+    import serialization
+    from feedback_index import normalized_result, compat_result
+
+    for path in sorted(glob.glob(os.path.join(CHECKPOINT_DIR, "checkpoint_*.json"))):
+        data = read_checkpoint(path)
+        normalized = normalized_result(data)
+        print(f"{os.path.basename(path)} ({len(data['all_data'])} rows, {len(normalized['flagged_row_ids'])} flagged)")
+        baseline = None
+        for label, result in [("flagged_entries copies", data), ("flagged_row_ids", normalized)]:
+            body = serialization.dumps(result)
+            baseline = baseline or len(body)
+            start = time.perf_counter()
+            for _ in range(iterations):
+                serialization.loads(body)
+            parse_ms = (time.perf_counter() - start) / iterations * 1000
+            print(f"  {label:<36} {len(body):>10,} bytes ({len(body) / baseline:>6.1%})  "
+                  f"gzip {len(gzip.compress(body)):>9,} bytes  parse {parse_ms:>6.2f} ms")
+
+        # The compat shape carries the same flagged entries (ties may come back in a different order)
+        def entry_key(entry):
+            return json.dumps(entry, sort_keys=True, default=str)
+        same = sorted(map(entry_key, compat_result(normalized)["flagged_entries"])) == sorted(map(entry_key, data["flagged_entries"]))
+        print(f"  parity: compat flagged_entries {same}")
+        if not same:
+            sys.exit("flagged_entries parity check failed")
+
+def bench_payload_size(iterations: int):
+    """Full /feedback payload vs field projection and columnar encoding, per checkpoint"""
+    import gzip
+    from row_encoding import encode_rows
+
+    dashboard_fields = ["timestamp", "instructor", "rating", "sentiment"]
+    variants = [
+        ("all_data as stored", {}),
+        ("fields=4 (dashboard)", {"fields": dashboard_fields}),
+        ("columnar, all fields, precision=3", {"encoding": "columnar"}),
+        ("columnar, fields=4", {"encoding": "columnar", "fields": dashboard_fields}),
+    ]
+    for path in sorted(glob.glob(os.path.join(CHECKPOINT_DIR, "checkpoint_*.json"))):
+        rows = read_checkpoint(path)["all_data"]
+        print(f"{os.path.basename(path)} ({len(rows)} rows)")
+        baseline = None
+        for label, options in variants:
+            body = json.dumps(encode_rows(rows, **options), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            baseline = baseline or len(body)
+            print(f"  {label:<36} {len(body):>10,} bytes ({len(body) / baseline:>6.1%})  gzip {len(gzip.compress(body)):>9,} bytes")
+
+def bench_search(iterations: int):
+    """Full-text queries over 100k rows: scanning the text vs the inverted index, with a parity check"""
+    from feedback_index import FeedbackIndex
+    from search_index import SEARCH_FIELDS, TextSearch, build_search_index, tokenize
+
+    _, data = load_sample_checkpoint()
+    rows = (data["all_data"] * (100_000 // max(1, len(data["all_data"])) + 1))[:100_000]
+    start = time.perf_counter()
+    search = TextSearch(FeedbackIndex(rows), build_search_index(rows))
+    print(f"{len(rows):,} rows, index built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def scan(phrase):
+        width = len(phrase)
+        return [row_id for row_id, row in enumerate(rows)
+                if any(tokens[i:i + width] == phrase for tokens in (tokenize(row.get(field)) for field in SEARCH_FIELDS)
+                       for i in range(len(tokens) - width + 1))]
+
+    for query in ("good", "too fast", '"very good session"'):
+        phrase = tokenize(query)
+        start = time.perf_counter()
+        expected = scan(phrase)
+        scanned = (time.perf_counter() - start) * 1000
+        search.search(query)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            search.search(query, limit=20)
+        indexed = (time.perf_counter() - start) / iterations * 1000
+        matched = sorted(row["row_id"] for row in search.search(query, limit=len(rows))["rows"])
+        print(f"{query:<22} {len(expected):>7,} matches  scan {scanned:>8.1f} ms  index {indexed:>6.3f} ms  "
+              f"parity: {matched == expected}")
+        if matched != expected:
+            sys.exit("search parity check failed")
+
+def bench_serialization(iterations: int):
+    """Encode/decode a 5,000-row result: stdlib json vs the shared serialization module"""
+    import numpy as np
+    import serialization
+
+    _, data = load_sample_checkpoint()
+    data = dict(data, all_data=data["all_data"][:5000])
+    # Values as they come out of a DataFrame row
+    numpy_data = dict(data, all_data=[
+        dict(row, rating=np.float64(row["rating"]), is_flagged=np.bool_(row["is_flagged"]))
+        for row in data["all_data"]
+    ])
+    encoded = serialization.dumps(data)
+    encoder = "orjson" if serialization.orjson else "json fallback"
+
+    cases = [
+        ("json.dumps(indent=2) (old checkpoints)", lambda: json.dumps(data, ensure_ascii=False, indent=2)),
+        ("json.dumps compact", lambda: json.dumps(data, ensure_ascii=False, separators=(",", ":"))),
+        (f"serialization.dumps ({encoder})", lambda: serialization.dumps(data)),
+        (f"serialization.dumps numpy values", lambda: serialization.dumps(numpy_data)),
+        ("json.loads", lambda: json.loads(encoded)),
+        (f"serialization.loads ({encoder})", lambda: serialization.loads(encoded)),
+    ]
+    print(f"payload: {len(data['all_data'])} rows, {len(encoded):,} bytes")
+    for label, fn in cases:
+        fn()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - start
+        print(f"{label:<40} {elapsed / iterations * 1000:>8.2f} ms")
+
+BENCHMARKS = {
+    "aggregation": bench_aggregation,
+    "async-load": bench_async_load,
+    "cached-feedback": bench_cached_feedback,
+    "checkpoint-size": bench_checkpoint_size,
+    "distinct-students": bench_distinct_students,
+    "payload-size": bench_payload_size,
+    "search": bench_search,
+    "serialization": bench_serialization,
+    "trends": bench_trends,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Feedback Insights benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS) + ["all"])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    names = sorted(BENCHMARKS) if args.benchmark == "all" else [args.benchmark]
+    for name in names:
+        print(f"\n== {name} ==")
+        BENCHMARKS[name](args.iterations)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import logging
+import os
+import threading
+
+from response_cache import file_version
+from serialization import load_file
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Cache Policy ----------------
+# A checkpoint is "fresh" for fresh_hours, then "stale" for max_stale_hours:
+# stale checkpoints are still served immediately while a background refresh
+# runs. Past that window it is "expired" and the caller waits for a refresh.
+# Defaults come from the environment; CACHE_POLICY_FILE overrides them per sheet:
+#   {"default": {"fresh_hours": 24, "max_stale_hours": 168},
+#    "sheets": {"<sheet_id>": {"fresh_hours": 1, "max_stale_hours": 12}}}
+DEFAULT_FRESH_HOURS = float(os.environ.get("CACHE_FRESH_HOURS", "24"))
+DEFAULT_MAX_STALE_HOURS = float(os.environ.get("CACHE_MAX_STALE_HOURS", "168"))
+CACHE_POLICY_FILE = os.environ.get("CACHE_POLICY_FILE", "cache_policy.json")
+POLICY_KEYS = ("fresh_hours", "max_stale_hours")
+
+_loaded = {"version": None, "config": {}}
+_lock = threading.Lock()
+
+def _clean(policy) -> dict:
+    if not isinstance(policy, dict):
+        return {}
+    return {key: float(policy[key]) for key in POLICY_KEYS if isinstance(policy.get(key), (int, float))}
+
+def _config() -> dict:
+    """Policy file contents, re-read whenever the file changes"""
+    version = file_version(CACHE_POLICY_FILE)
+    with _lock:
+        if version != _loaded["version"]:
+            config = {}
+            if version is not None:
+                try:
+                    raw = load_file(CACHE_POLICY_FILE)
+                    config = {
+                        "default": _clean(raw.get("default")),
+                        "sheets": {str(k): _clean(v) for k, v in (raw.get("sheets") or {}).items()},
+                    }
+                    logger.info(f"Loaded cache policy from {CACHE_POLICY_FILE}")
+                except Exception as e:
+                    logger.error(f"Error loading cache policy {CACHE_POLICY_FILE}: {str(e)}")
+            _loaded["version"], _loaded["config"] = version, config
+        return _loaded["config"]
+
+def get_cache_policy(sheet_id: str) -> dict:
+    """fresh_hours / max_stale_hours for a sheet"""
+    config = _config()
+    policy = {"fresh_hours": DEFAULT_FRESH_HOURS, "max_stale_hours": DEFAULT_MAX_STALE_HOURS}
+    policy.update(config.get("default", {}))
+    policy.update(config.get("sheets", {}).get(sheet_id, {}))
+    return policy
+
+def freshness(age_hours: float, policy: dict) -> str:
+    """'fresh', 'stale' or 'expired' for a checkpoint of the given age"""
+    if age_hours < policy["fresh_hours"]:
+        return "fresh"
+    if age_hours < policy["fresh_hours"] + policy["max_stale_hours"]:
+        return "stale"
+    return "expired"
@@ -0,0 +1,141 @@
+import logging
+import os
+import threading
+
+from aggregation import AGGREGATES_VERSION, merge_buckets, summary_from_aggregates, instructor_stats_from_aggregates
+from checkpoint_store import read_header, CheckpointCorrupt, MAX_HEADER_BYTES
+from response_cache import file_version
+from serialization import dumps, load_file
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Campus Registry ----------------
+# Sheets compared by /campuses/summary. Defaults mirror the dashboard's campus
+# picker; CAMPUS_REGISTRY_FILE replaces them and is re-read whenever it changes:
+#   {"campuses": [{"label": "ADYPU", "sheet_id": "1Zt0..."}, ...]}
+# Each sheet's checkpoint header carries a compact form of its aggregates, so
+# the summary reads one header line per campus and never the rows:
+#   {"campus": {"version": 1, "aggregates_version": 4, "total": bucket,
+#               "instructor_count": 12, "instructor_stats": {"instructor": [...], "average_rating": [...], ...}}}
+# The total bucket is kept whole because its histograms and student sketch
+# merge across campuses; instructors keep only LEADERBOARD_FIELDS, stored as
+# columns (a full bucket is ~800 B, which pushed sheets past ~75 instructors
+# over MAX_HEADER_BYTES). If the instructors still do not fit they are left out
+# ("instructors_omitted"). A header the checkpoint store wrote without metadata
+# ("metadata_omitted") is reported as such rather than refreshed again.
+CAMPUS_REGISTRY_FILE = os.environ.get("CAMPUS_REGISTRY_FILE", "campuses.json")
+DEFAULT_CAMPUSES = [
+    {"label": "Annamacharya", "sheet_id": "1ZMmrHHmIAbGIERfWNnkP0cdvsXI87RzkwgZlZeXvys4"},
+    {"label": "CDU", "sheet_id": "1qLrf0yyziHQ9uqDywzR8OXSYHof3Yb6zRW2gXkCF6oI"},
+    {"label": "Mallareddy", "sheet_id": "16q8Om0Wky3qA22ATof4NleEiYGzc_4jSQbPGNaJHXKA"},
+    {"label": "NSRIT", "sheet_id": "1gzo8Kay2Fkpf9EdBPNHMx6i__L_HRA5URlGBCcl5miY"},
+    {"label": "NRI", "sheet_id": "1lrpBpg3Xdv3DH914iIVHWYwRvlq-fa2qOISl1LZEyeQ"},
+    {"label": "Crescent", "sheet_id": "1ZE7CP9WLOq9xYAKVcC0xFZjBKAb2NQtqQNh5F6LFQy8"},
+    {"label": "CIET", "sheet_id": "1VAdrCSbCshp6IywoniMvPpkqt2wdyXveLo29rYxyqAQ"},
+    {"label": "NIT", "sheet_id": "1ZMmrHHmIAbGIERfWNnkP0cdvsXI87RzkwgZlZeXvys4"},
+    {"label": "ADYPU", "sheet_id": "1Zt037mPDlvF3QvE5u4ONLKzx4t5zwY15yRRW8PuLIRI"},
+    {"label": "Aurora", "sheet_id": "1gToNHTcrC3vLLPg9RIV4bkHpQu0a4irXpkwOHrFM1PY"},
+]
+
+_registry = {"version": None, "campuses": DEFAULT_CAMPUSES}
+_headers = {}  # file_path -> (file_version, aggregates or None)
+_lock = threading.Lock()
+
+def get_campuses() -> list:
+    """Registered campuses as {"label", "sheet_id"} dicts"""
+    version = file_version(CAMPUS_REGISTRY_FILE)
+    with _lock:
+        if version != _registry["version"]:
+            campuses = DEFAULT_CAMPUSES
+            if version is not None:
+                try:
+                    campuses = [
+                        {"label": str(entry["label"]), "sheet_id": str(entry["sheet_id"])}
+                        for entry in load_file(CAMPUS_REGISTRY_FILE)["campuses"]
+                    ]
+                    logger.info(f"Loaded {len(campuses)} campuses from {CAMPUS_REGISTRY_FILE}")
+                except Exception as e:
+                    logger.error(f"Error loading campus registry {CAMPUS_REGISTRY_FILE}: {str(e)}")
+            _registry["version"], _registry["campuses"] = version, campuses
+        return _registry["campuses"]
+
+CAMPUS_HEADER_VERSION = 1
+LEADERBOARD_FIELDS = ("instructor", "total_responses", "average_rating", "negative_count",
+                      "sentiment_score", "sentiment_stddev", "unique_students")
+HEADER_BUDGET = MAX_HEADER_BYTES - 1024  # room for the store's own header fields
+
+def campus_meta(aggregates: dict) -> dict:
+    """Compact campus-summary form of a sheet's aggregates"""
+    stats = instructor_stats_from_aggregates(aggregates)
+    meta = {
+        "version": CAMPUS_HEADER_VERSION,
+        "aggregates_version": aggregates["version"],
+        "total": aggregates["total"],
+        "instructor_count": len(stats),
+        "instructor_stats": {field: [stat[field] for stat in stats] for field in LEADERBOARD_FIELDS},
+    }
+    if len(dumps(meta)) > HEADER_BUDGET:
+        meta.update(instructor_stats={field: [] for field in LEADERBOARD_FIELDS}, instructors_omitted=True)
+    return meta
+
+def leaderboard_stats(meta: dict) -> list:
+    """Instructor stat dicts (most negative feedback first) from campus metadata's columns"""
+    columns = meta["instructor_stats"]
+    return [dict(zip(LEADERBOARD_FIELDS, values)) for values in zip(*(columns[field] for field in LEADERBOARD_FIELDS))]
+
+def header_meta(result: dict) -> dict:
+    """Checkpoint header metadata for a result: its compact aggregates"""
+    return {"campus": campus_meta(result["aggregates"])} if result.get("aggregates") else {}
+
+def header_campus(file_path: str, version: str = None):
+    """Campus metadata in a checkpoint's header, cached per file version
+
+    None when the header predates it (a refresh adds it); {"omitted": reason}
+    when the current version was written without it.
+    """
+    version = version or file_version(file_path)
+    if version is None:
+        return None
+    with _lock:
+        cached = _headers.get(file_path)
+    if cached and cached[0] == version:
+        return cached[1]
+    try:
+        header = read_header(file_path) or {}
+    except (OSError, CheckpointCorrupt) as e:
+        logger.error(f"Error reading checkpoint header {file_path}: {str(e)}")
+        return None
+    meta = header.get("campus")
+    if header.get("metadata_omitted"):
+        meta = {"omitted": f"metadata omitted for {header['metadata_omitted']}"}
+    elif not isinstance(meta, dict) or meta.get("version") != CAMPUS_HEADER_VERSION \
+            or meta.get("aggregates_version") != AGGREGATES_VERSION:
+        meta = None
+    with _lock:
+        _headers[file_path] = (version, meta)
+    return meta
+
+# ---------------- Campus Summary ----------------
+def campus_summary(campus: dict, meta, state: str, limit: int = 5) -> dict:
+    """Headline metrics and instructor leaderboards for one campus"""
+    entry = {"label": campus["label"], "sheet_id": campus["sheet_id"], "state": state}
+    if not meta or meta.get("omitted"):
+        entry["summary"] = None
+        if meta:
+            entry["summary_omitted"] = meta["omitted"]
+        return entry
+    total = meta["total"]
+    stats = leaderboard_stats(meta)
+    entry["summary"] = dict(summary_from_aggregates({"total": total}), flagged_count=total["flagged"],
+                            instructor_count=meta["instructor_count"])
+    entry["top_instructors"] = sorted(stats, key=lambda x: (-x["average_rating"], -x["total_responses"]))[:limit]
+    entry["needs_attention"] = [stat for stat in stats if stat["negative_count"] > 0][:limit]
+    if meta.get("instructors_omitted"):
+        entry["instructors_omitted"] = True
+    return entry
+
+def overall_summary(meta_by_sheet: dict) -> dict:
+    """Summary across every campus with metadata, counting a sheet shared by two campuses once"""
+    totals = [meta["total"] for meta in meta_by_sheet.values() if meta and not meta.get("omitted")]
+    total = merge_buckets(totals)
+    return dict(summary_from_aggregates({"total": total}), flagged_count=total["flagged"], sheets=len(totals))
@@ -0,0 +1,81 @@
+import os
+import time
+
+from aggregation import row_key
+
+# ---------------- Change Log ----------------
+# Each sheet's result carries a revision that only moves forward, and a log of
+# the row keys (aggregation.row_key) each revision touched, persisted with the
+# checkpoint under "changes":
+#   {"version": 1, "revision": 1754380000123, "base": 1754370000000,
+#    "log": [{"revision": 1754380000123, "inserted": [key, ...], "updated": [...], "deleted": [...]}, ...]}
+# Revisions are milliseconds since the epoch, bumped by at least one, so a
+# rebuilt checkpoint (a new log) always starts past every revision a client
+# saw before. A refresh that changes no rows keeps the revision. The log keeps
+# the last CHANGE_LOG_MAX_ENTRIES revisions; "base" is the oldest revision
+# the log can still bring a client forward from.
+CHANGE_LOG_VERSION = 1
+CHANGE_LOG_MAX_ENTRIES = int(os.environ.get("CHANGE_LOG_MAX_ENTRIES", "100"))
+CHANGE_OPS = ("inserted", "updated", "deleted")
+
+def next_revision(previous: int = 0) -> int:
+    return max(int(time.time() * 1000), previous + 1)
+
+def new_change_log() -> dict:
+    """Log for a result built from scratch: nothing to replay before its revision"""
+    revision = next_revision()
+    return {"version": CHANGE_LOG_VERSION, "revision": revision, "base": revision, "log": []}
+
+def change_log_valid(change_log) -> bool:
+    return isinstance(change_log, dict) and change_log.get("version") == CHANGE_LOG_VERSION
+
+def record_changes(change_log: dict, added: list, removed: list) -> dict:
+    """Log with one more revision for the added / removed rows (diff_rows); unchanged when both are empty"""
+    if not added and not removed:
+        return change_log
+    added_keys = {row_key(row) for row in added}
+    removed_keys = {row_key(row) for row in removed}
+    revision = next_revision(change_log["revision"])
+    log = change_log["log"] + [{
+        "revision": revision,
+        "inserted": sorted(added_keys - removed_keys),
+        "updated": sorted(added_keys & removed_keys),
+        "deleted": sorted(removed_keys - added_keys),
+    }]
+    base = change_log["base"]
+    if len(log) > CHANGE_LOG_MAX_ENTRIES:
+        base = log[-CHANGE_LOG_MAX_ENTRIES - 1]["revision"]
+        log = log[-CHANGE_LOG_MAX_ENTRIES:]
+    return {"version": CHANGE_LOG_VERSION, "revision": revision, "base": base, "log": log}
+
+def changes_since(change_log: dict, since: int, rows: list, key_ids_of) -> dict:
+    """Rows changed after revision since, netted over the log
+
+    A key's rows are reported as they are now ("inserted" if the key first
+    appeared after since, else "updated"), so a client replaces all of its rows
+    with that key; keys with no rows left are "deleted". key_ids_of() gives
+    row_key -> row ids and is only called when there are changes. Returns
+    {"full_sync_required": True} when the log cannot bring since forward.
+    """
+    revision = change_log["revision"]
+    if since == revision:
+        return {"up_to_date": True}
+    if since < change_log["base"] or since > revision:
+        return {"full_sync_required": True}
+
+    first_ops = {}
+    for entry in change_log["log"]:
+        if entry["revision"] > since:
+            for op in CHANGE_OPS:
+                for key in entry[op]:
+                    first_ops.setdefault(key, op)
+    changes = {op: [] for op in CHANGE_OPS}
+    key_ids = key_ids_of() if first_ops else {}
+    for key, op in first_ops.items():
+        row_ids = key_ids.get(key)
+        if row_ids:
+            changes["inserted" if op == "inserted" else "updated"].extend(
+                dict(rows[row_id], row_id=row_id, row_key=key) for row_id in row_ids)
+        elif op != "inserted":
+            changes["deleted"].append(key)
+    return dict(changes, up_to_date=False)
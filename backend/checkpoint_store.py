@@ -0,0 +1,97 @@
+import hashlib
+import logging
+import os
+import tempfile
+from datetime import datetime
+
+from serialization import dumps, loads
+from single_flight import FileLock
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Checkpoint Store ----------------
+# Checkpoints are written to a temp file in the same directory and moved into
+# place with os.replace, so readers see either the old file or the new one,
+# never a half-written one. The first line is a header carrying the body's
+# length and sha256, which lets readers tell a torn or corrupt file from a
+# valid one:
+#   #checkpoint {"bytes": 2149817, "sha256": "...", "written_at": "..."}
+#   {"summary": ..., "all_data": [...]}
+# Callers may add small metadata to the header (e.g. a sheet's aggregates) so
+# it can be read without loading the body; metadata that would push the header
+# past MAX_HEADER_BYTES is dropped and the header says so ("metadata_omitted":
+# "size"). Files without a header (written before this format) are read as
+# plain JSON.
+HEADER_PREFIX = b"#checkpoint "
+MAX_HEADER_BYTES = 64 * 1024
+FILE_MODE = 0o644
+
+class CheckpointCorrupt(Exception):
+    """Raised when a checkpoint file fails its checksum or cannot be parsed"""
+
+def checkpoint_lock(file_path: str) -> FileLock:
+    """Exclusive cross-process lock for read-modify-write cycles on a checkpoint (not yet acquired)"""
+    return FileLock(f"{file_path}.lock")
+
+def write_checkpoint(file_path: str, data: dict, meta: dict = None):
+    """Atomically replace file_path with data behind a checksummed header"""
+    body = dumps(data)
+    header = dict(meta or {}, bytes=len(body), sha256=hashlib.sha256(body).hexdigest(),
+                  written_at=datetime.now().isoformat())
+    encoded_header = dumps(header)
+    if len(HEADER_PREFIX) + len(encoded_header) >= MAX_HEADER_BYTES:
+        logger.warning(f"Header metadata for {file_path} is {len(encoded_header)} bytes, writing it without metadata")
+        header = dict({key: header[key] for key in ("bytes", "sha256", "written_at")}, metadata_omitted="size")
+        encoded_header = dumps(header)
+    directory = os.path.dirname(file_path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".checkpoint_", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER_PREFIX + encoded_header + b"\n")
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, FILE_MODE)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return header
+
+def _split(raw: bytes):
+    """(header, body) of a checkpoint file's bytes; header is None for legacy files"""
+    if not raw.startswith(HEADER_PREFIX):
+        return None, raw
+    end = raw.find(b"\n", 0, MAX_HEADER_BYTES)
+    if end < 0:
+        raise CheckpointCorrupt("Checkpoint header is not terminated")
+    try:
+        header = loads(raw[len(HEADER_PREFIX):end])
+    except ValueError as e:
+        raise CheckpointCorrupt(f"Checkpoint header is not valid JSON: {str(e)}")
+    return header, raw[end + 1:]
+
+def read_checkpoint(file_path: str) -> dict:
+    """Verified checkpoint contents; raises CheckpointCorrupt for torn or damaged files"""
+    with open(file_path, "rb") as f:
+        raw = f.read()
+    header, body = _split(raw)
+    if header is not None:
+        if len(body) != header.get("bytes"):
+            raise CheckpointCorrupt(f"Checkpoint is {len(body)} bytes, header says {header.get('bytes')}")
+        if hashlib.sha256(body).hexdigest() != header.get("sha256"):
+            raise CheckpointCorrupt("Checkpoint checksum mismatch")
+    try:
+        return loads(body)
+    except ValueError as e:
+        raise CheckpointCorrupt(f"Checkpoint is not valid JSON: {str(e)}")
+
+def read_header(file_path: str):
+    """Header of a checkpoint without reading its body (None for legacy files)"""
+    with open(file_path, "rb") as f:
+        first_line = f.readline(MAX_HEADER_BYTES)
+    if not first_line.startswith(HEADER_PREFIX):
+        return None
+    header, _ = _split(first_line)
+    return header
@@ -0,0 +1,155 @@
+import atexit
+import logging
+import threading
+import time
+
+from checkpoint_store import write_checkpoint, checkpoint_lock
+from response_cache import file_version
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Write-Behind Checkpoints ----------------
+# Requests hand finished results to schedule_write() and return immediately;
+# one background thread encodes and writes them. Repeated saves of the same
+# checkpoint before it is written collapse into the latest one. Until a write
+# lands, pending_checkpoint() serves the queued result and checkpoint_version()
+# reports a "pending-N" version so caches keyed by version never mix old and
+# new data. Pending writes are flushed at interpreter exit.
+# Each write lands under the checkpoint's cross-process lock. A caller that
+# already holds it (a refresh that re-checked the file before fetching) hands
+# it over with the result; the writer releases it once the file is replaced,
+# so other worker processes waiting on the lock re-check a file that is
+# already current. Threads in this process read through pending_checkpoint().
+_pending = {}  # file_path -> (data, seq, queued_at, meta, lock)
+_writing = {}  # file_path -> (data, seq)
+_cond = threading.Condition()
+_thread = None
+_seq = 0
+_stats = {"scheduled": 0, "coalesced": 0, "writes": 0, "failures": 0,
+          "total_write_ms": 0.0, "max_write_ms": 0.0, "last_write_ms": None, "max_queue_wait_ms": 0.0}
+
+def _copy(data: dict) -> dict:
+    """Shallow copy so callers can adjust processing_info without touching the queued result"""
+    return {k: (dict(v) if isinstance(v, dict) else v) for k, v in data.items()}
+
+def schedule_write(file_path: str, data: dict, meta: dict = None, lock=None):
+    """Queue data to be written to file_path by the background writer (meta goes into the header)
+
+    lock is a held checkpoint_lock() the writer takes over and releases after the write.
+    """
+    global _thread, _seq
+    with _cond:
+        _seq += 1
+        previous = _pending.get(file_path)
+        if previous is not None:
+            _stats["coalesced"] += 1
+            if lock is None:
+                lock = previous[4]
+            elif previous[4] is not None:
+                previous[4].release()
+        _pending[file_path] = (data, _seq, time.perf_counter(), meta, lock)
+        _stats["scheduled"] += 1
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_run, name="checkpoint-writer", daemon=True)
+            _thread.start()
+        _cond.notify_all()
+
+def _run():
+    while True:
+        with _cond:
+            while not _pending:
+                _cond.wait()
+            file_path = next(iter(_pending))
+            data, seq, queued_at, meta, lock = _pending.pop(file_path)
+            if lock is None:
+                lock = checkpoint_lock(file_path)
+                if not lock.try_acquire():
+                    # Its holder will queue a newer result or write the file itself; retry shortly
+                    _pending.setdefault(file_path, (data, seq, queued_at, meta, None))
+                    _cond.wait(0.05)
+                    continue
+            _writing[file_path] = (data, seq)
+        _write(file_path, data, meta, queued_at, lock)
+
+def _write(file_path: str, data: dict, meta: dict, queued_at: float, lock) -> bool:
+    """Write an entry taken from _pending (and registered in _writing), release its lock and record its stats"""
+    start = time.perf_counter()
+    try:
+        write_checkpoint(file_path, data, meta)
+        failed = False
+    except Exception as e:
+        logger.error(f"Error writing checkpoint {file_path}: {str(e)}")
+        failed = True
+    finally:
+        lock.release()
+    write_ms = (time.perf_counter() - start) * 1000
+
+    with _cond:
+        _writing.pop(file_path, None)
+        if failed:
+            _stats["failures"] += 1
+        else:
+            _stats["writes"] += 1
+            _stats["total_write_ms"] += write_ms
+            _stats["max_write_ms"] = max(_stats["max_write_ms"], write_ms)
+            _stats["last_write_ms"] = round(write_ms, 2)
+        _stats["max_queue_wait_ms"] = max(_stats["max_queue_wait_ms"], (start - queued_at) * 1000)
+        _cond.notify_all()
+    if not failed:
+        logger.info(f"Wrote checkpoint {file_path} in {write_ms:.1f} ms")
+    return not failed
+
+def pending_checkpoint(file_path: str):
+    """The result queued (or being written) for file_path, or None"""
+    with _cond:
+        entry = _pending.get(file_path) or _writing.get(file_path)
+    return _copy(entry[0]) if entry else None
+
+def has_pending_write(file_path: str) -> bool:
+    with _cond:
+        return file_path in _pending or file_path in _writing
+
+def checkpoint_version(file_path: str):
+    """'pending-N' while a write is queued, else the file's stat() version"""
+    with _cond:
+        entry = _pending.get(file_path) or _writing.get(file_path)
+    if entry:
+        return f"pending-{entry[1]}"
+    return file_version(file_path)
+
+def discard_pending(file_path: str = None) -> int:
+    """Drop queued writes (all of them if file_path is None), wait out one in progress, and return how many were dropped"""
+    with _cond:
+        dropped = [_pending.pop(path) for path in ([file_path] if file_path else list(_pending)) if path in _pending]
+        for entry in dropped:
+            if entry[4] is not None:
+                entry[4].release()
+        _cond.wait_for(lambda: not (_writing if file_path is None else file_path in _writing))
+    return len(dropped)
+
+def flush_writes(timeout: float = None) -> bool:
+    """Block until every queued write has landed; False if timeout expired first"""
+    with _cond:
+        return _cond.wait_for(lambda: not _pending and not _writing, timeout)
+
+def writer_stats() -> dict:
+    with _cond:
+        writes = _stats["writes"]
+        return {
+            "queue_depth": len(_pending),
+            "in_flight": len(_writing),
+            "scheduled": _stats["scheduled"],
+            "coalesced": _stats["coalesced"],
+            "writes": writes,
+            "failures": _stats["failures"],
+            "last_write_ms": _stats["last_write_ms"],
+            "avg_write_ms": round(_stats["total_write_ms"] / writes, 2) if writes else None,
+            "max_write_ms": round(_stats["max_write_ms"], 2),
+            "max_queue_wait_ms": round(_stats["max_queue_wait_ms"], 2),
+        }
+
+@atexit.register
+def _flush_at_exit():
+    if _pending or _writing:
+        logger.info(f"Flushing {len(_pending) + len(_writing)} pending checkpoint writes")
+        flush_writes(timeout=30)
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# ---------------- Executors ----------------
+# Async endpoints never block the event loop: network and disk I/O (gspread,
+# checkpoint reads) run on the I/O pool, pandas processing, sentiment scoring
+# and response encoding run on the CPU pool. Scoring a refreshed sheet runs on
+# its own refresh pool, so a burst of cold refreshes never holds the CPU
+# threads that filter and page cached results. Each pool has its own worker
+# count, so a burst of cold refreshes cannot starve cached reads or /health.
+IO_WORKERS = int(os.environ.get("IO_WORKERS", "8"))
+CPU_WORKERS = int(os.environ.get("CPU_WORKERS", str(min(4, os.cpu_count() or 1))))
+REFRESH_WORKERS = int(os.environ.get("REFRESH_WORKERS", str(max(1, CPU_WORKERS // 2))))
+
+_pools = {
+    "io": ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="feedback-io"),
+    "cpu": ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="feedback-cpu"),
+    "refresh": ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="feedback-refresh"),
+}
+_counts = {name: {"active": 0, "waiting": 0} for name in _pools}
+_lock = threading.Lock()
+
+def _count(pool: str, state: str, delta: int):
+    with _lock:
+        _counts[pool][state] += delta
+
+def _tracked(pool: str, fn):
+    _count(pool, "waiting", -1)
+    _count(pool, "active", 1)
+    try:
+        return fn()
+    finally:
+        _count(pool, "active", -1)
+
+async def _run(pool: str, fn, *args, **kwargs):
+    _count(pool, "waiting", 1)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pools[pool], _tracked, pool, partial(fn, *args, **kwargs))
+
+async def run_io(fn, *args, **kwargs):
+    """Run a blocking network/disk call on the I/O pool"""
+    return await _run("io", fn, *args, **kwargs)
+
+async def run_cpu(fn, *args, **kwargs):
+    """Run CPU-bound processing on the CPU pool"""
+    return await _run("cpu", fn, *args, **kwargs)
+
+async def run_refresh(fn, *args, **kwargs):
+    """Run the scoring step of a sheet refresh on the refresh pool"""
+    return await _run("refresh", fn, *args, **kwargs)
+
+def executor_stats() -> dict:
+    with _lock:
+        counts = {name: dict(values) for name, values in _counts.items()}
+    counts["io"]["workers"] = IO_WORKERS
+    counts["cpu"]["workers"] = CPU_WORKERS
+    counts["refresh"]["workers"] = REFRESH_WORKERS
+    return counts
+
+def shutdown_executors(wait: bool = True):
+    for pool in _pools.values():
+        pool.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,538 @@
+import base64
+import bisect
+import heapq
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from aggregation import build_summary, build_instructor_stats, row_key
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Row Index ----------------
+# Per-sheet in-memory index over the processed rows (``all_data``). Row ids are
+# positions in ``all_data``; each sort order is kept as a sorted list of
+# (key, row_id) pairs so pages are found with a binary search on the cursor.
+# Flagged rows are one more order, keyed by (confidence, timestamp): the
+# flagged rows of a result are derived from it by row id instead of being
+# re-sorted on every request, and the first page comes from a heap over the
+# flagged posting list without sorting every flagged row.
+# Each row's sort keys are cached by row id, so a small selection (one
+# instructor's posting list) is ordered from those keys in time proportional
+# to its size instead of being filtered out of the whole sheet's order.
+TIMESTAMP_FORMATS = [
+    "%m/%d/%Y %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%fZ",
+    "%Y-%m-%dT%H:%M:%S",
+    "%m/%d/%Y",
+    "%Y-%m-%d",
+]
+SORT_FIELDS = ("timestamp", "confidence")
+FILTER_FIELDS = ("instructor", "sentiment", "college")
+INDEX_CACHE_MAX_ENTRIES = int(os.environ.get("INDEX_CACHE_MAX_ENTRIES", "32"))
+# Selections smaller than 1/SUBSET_SORT_RATIO of the rows are sorted on their own
+SUBSET_SORT_RATIO = 4
+
+def parse_datetime(value):
+    """Parse a sheet timestamp into a naive datetime (None if unparseable)"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+def parse_timestamp(value):
+    """Parse a sheet timestamp into epoch seconds (None if unparseable)"""
+    moment = parse_datetime(value)
+    return moment.timestamp() if moment is not None else None
+
+def normalize_value(value) -> str:
+    """Case- and whitespace-insensitive key used by the posting lists"""
+    return str(value if value is not None else "").strip().lower()
+
+def _sort_key(row, sort: str):
+    if sort == "timestamp":
+        key = parse_timestamp(row.get("timestamp"))
+    else:
+        try:
+            key = float(row.get(sort) or 0)
+        except (TypeError, ValueError):
+            key = None
+    # Missing keys sort before everything else
+    return float("-inf") if key is None else key
+
+def flagged_key(row) -> tuple:
+    """Flagged order key: confidence, then timestamp (works on rows and flagged entries)"""
+    return _sort_key(row, "confidence"), _sort_key(row, "timestamp")
+
+def _encode_key(key):
+    if isinstance(key, tuple):
+        return [_encode_key(part) for part in key]
+    return None if key == float("-inf") else key
+
+def _decode_key(value):
+    if isinstance(value, list):
+        return tuple(_decode_key(part) for part in value)
+    return float("-inf") if value is None else float(value)
+
+def encode_cursor(sort: str, order: str, entry) -> str:
+    key, row_id = entry
+    payload = {"s": sort, "o": order, "k": _encode_key(key), "i": row_id}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str, order: str):
+    """Decode a cursor into its (key, row_id) position; raises ValueError if invalid"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        entry = (_decode_key(payload["k"]), int(payload["i"]))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if payload.get("s") != sort or payload.get("o") != order:
+        raise ValueError("Cursor does not match the requested sort order")
+    return entry
+
+class FeedbackIndex:
+    """Sorted views over one version of a sheet's rows"""
+
+    def __init__(self, rows: list, processing_info: dict = None, rollups: dict = None, student_index: dict = None,
+                 instructor_index: dict = None, search_index: dict = None, aggregates: dict = None,
+                 change_log: dict = None):
+        self.rows = rows
+        self.processing_info = processing_info or {}
+        self.aggregates = aggregates
+        self.change_log = change_log
+        self.rollups = rollups
+        self.student_index = student_index
+        self.search_index = search_index
+        self.text_search = None
+        self.instructor_index = instructor_index if postings_index_matches(instructor_index, rows) else None
+        self._orders = {}
+        self._keys = {}
+        self._postings = {}
+        if self.instructor_index is not None:
+            # Persisted postings use the same normalized keys, so they stand in for the built ones
+            self._postings["instructor"] = self.instructor_index["postings"]
+        self._lock = threading.Lock()
+
+    def row_keys(self, sort: str) -> list:
+        """Sort key of every row by row id, built on first use"""
+        keys = self._keys.get(sort)
+        if keys is None:
+            keys = [_sort_key(row, sort) for row in self.rows]
+            self._keys[sort] = keys
+        return keys
+
+    def sorted_entries(self, sort: str) -> list:
+        """(key, row_id) pairs in ascending order, built on first use"""
+        entries = self._orders.get(sort)
+        if entries is None:
+            keys = self.row_keys(sort)
+            with self._lock:
+                entries = self._orders.get(sort)
+                if entries is None:
+                    entries = sorted(zip(keys, range(len(keys))))
+                    self._orders[sort] = entries
+        return entries
+
+    def selected_entries(self, sort: str, row_ids) -> list:
+        """(key, row_id) pairs of a row selection (all rows if None) in ascending order"""
+        if row_ids is None:
+            return self.sorted_entries(sort)
+        if len(row_ids) * SUBSET_SORT_RATIO < len(self.rows):
+            keys = self.row_keys(sort)
+            return sorted((keys[row_id], row_id) for row_id in row_ids)
+        matched = set(row_ids)
+        return [entry for entry in self.sorted_entries(sort) if entry[1] in matched]
+
+    def postings(self, field: str) -> dict:
+        """Normalized field value -> ascending row ids, built on first use"""
+        postings = self._postings.get(field)
+        if postings is None:
+            with self._lock:
+                postings = self._postings.get(field)
+                if postings is None:
+                    postings = {}
+                    for row_id, row in enumerate(self.rows):
+                        postings.setdefault(normalize_value(row.get(field)), []).append(row_id)
+                    self._postings[field] = postings
+        return postings
+
+    def row_key_ids(self) -> dict:
+        """row_key -> ascending row ids, built on first use"""
+        key_ids = self._postings.get("row_key")
+        if key_ids is None:
+            with self._lock:
+                key_ids = self._postings.get("row_key")
+                if key_ids is None:
+                    key_ids = {}
+                    for row_id, row in enumerate(self.rows):
+                        key_ids.setdefault(row_key(row), []).append(row_id)
+                    self._postings["row_key"] = key_ids
+        return key_ids
+
+    def flagged_order(self) -> list:
+        """(flagged_key, row_id) pairs of flagged rows in ascending order, built on first use"""
+        entries = self._orders.get("flagged")
+        if entries is None:
+            row_ids = self.flagged_row_ids()
+            with self._lock:
+                entries = self._orders.get("flagged")
+                if entries is None:
+                    entries = sorted((flagged_key(self.rows[row_id]), row_id) for row_id in row_ids)
+                    self._orders["flagged"] = entries
+        return entries
+
+    def flagged_row_ids(self) -> list:
+        return self.postings("is_flagged").get("true", [])
+
+    def flagged_among(self, row_ids=None) -> list:
+        """Flagged row ids within a selection (all rows if None)"""
+        if row_ids is None:
+            return self.flagged_row_ids()
+        return [row_id for row_id in row_ids if self.rows[row_id].get("is_flagged")]
+
+    def flagged_keys(self, row_ids) -> list:
+        """(flagged_key, row_id) pairs for row ids, from the cached sort keys"""
+        confidence, timestamp = self.row_keys("confidence"), self.row_keys("timestamp")
+        return [((confidence[row_id], timestamp[row_id]), row_id) for row_id in row_ids]
+
+    def flagged_entries_among(self, row_ids, flagged: list = None) -> list:
+        """(flagged_key, row_id) pairs of the flagged rows in a selection (all rows if None), ascending
+
+        flagged is flagged_among(row_ids) when the caller already has it.
+        """
+        if row_ids is None or len(row_ids) * SUBSET_SORT_RATIO >= len(self.rows):
+            entries = self.flagged_order()
+            if row_ids is None:
+                return entries
+            matched = set(row_ids)
+            return [entry for entry in entries if entry[1] in matched]
+        return sorted(self.flagged_keys(self.flagged_among(row_ids) if flagged is None else flagged))
+
+    def top_flagged(self, k: int, row_ids=None, flagged: list = None) -> list:
+        """(key, row_id) of the k highest flagged rows among row_ids (all rows if None), highest first"""
+        if "flagged" in self._orders and (row_ids is None or len(row_ids) * SUBSET_SORT_RATIO >= len(self.rows)):
+            entries = self.flagged_entries_among(row_ids, flagged)
+            return entries[max(0, len(entries) - k):][::-1]
+        return heapq.nlargest(k, self.flagged_keys(self.flagged_among(row_ids) if flagged is None else flagged))
+
+    def flagged_ids(self, row_ids=None) -> list:
+        """Flagged rows among row_ids (all rows if None) as positions in that selection, highest confidence first"""
+        entries = self.flagged_order()
+        if row_ids is None:
+            return [row_id for _, row_id in reversed(entries)]
+        positions = {row_id: position for position, row_id in enumerate(row_ids)}
+        return [positions[row_id] for _, row_id in reversed(entries) if row_id in positions]
+
+    def flagged_page(self, cursor: str = None, limit: int = 50, filters: dict = None) -> dict:
+        """One page of flagged rows, highest confidence (then newest) first"""
+        row_ids = self.filter_row_ids(filters or {})
+        flagged = self.flagged_among(row_ids)
+        if cursor is None:
+            # The first page only needs the top limit + 1 entries
+            selected = self.top_flagged(limit + 1, row_ids, flagged)
+            has_more = len(selected) > limit
+            selected = selected[:limit]
+        else:
+            entries = self.flagged_entries_among(row_ids, flagged)
+            end = bisect.bisect_left(entries, decode_cursor(cursor, "flagged", "desc"))
+            selected = entries[max(0, end - limit):end][::-1]
+            has_more = end - limit > 0
+        return {
+            "flagged_entries": [dict(flagged_entry(self.rows[row_id]), row_id=row_id) for _, row_id in selected],
+            "next_cursor": encode_cursor("flagged", "desc", selected[-1]) if selected and has_more else None,
+            "total_flagged": len(flagged),
+        }
+
+    def timestamp_range(self, start: float = None, end: float = None) -> list:
+        """Row ids with start <= timestamp < end, via binary search on the timestamp order"""
+        entries = self.sorted_entries("timestamp")
+        if start is None:
+            # Rows without a parseable timestamp never match a date filter
+            lo = bisect.bisect_right(entries, (float("-inf"), len(entries)))
+        else:
+            lo = bisect.bisect_left(entries, (start, -1))
+        hi = bisect.bisect_left(entries, (end, -1)) if end is not None else len(entries)
+        return [row_id for _, row_id in entries[lo:hi]]
+
+    def filter_row_ids(self, filters: dict):
+        """Ascending row ids matching every filter, or None when no filter is set"""
+        candidates = []
+        dated = filters.get("start") is not None or filters.get("end") is not None
+        if dated:
+            candidates.append(self.timestamp_range(filters.get("start"), filters.get("end")))
+        for field in FILTER_FIELDS:
+            if filters.get(field):
+                candidates.append(self.postings(field).get(normalize_value(filters[field]), []))
+        if not candidates:
+            return None
+        if len(candidates) == 1 and not dated:
+            # A single posting list is already ascending (callers only read it)
+            return candidates[0]
+
+        candidates.sort(key=len)
+        matched = set(candidates[0])
+        for ids in candidates[1:]:
+            matched.intersection_update(ids)
+            if not matched:
+                break
+        return sorted(matched)
+
+    def page(self, sort: str = "timestamp", order: str = "desc", cursor: str = None, limit: int = 100,
+             filters: dict = None) -> dict:
+        """One page of rows plus the cursor for the next page"""
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_FIELDS)}")
+        if order not in ("asc", "desc"):
+            raise ValueError("order must be 'asc' or 'desc'")
+
+        entries = self.selected_entries(sort, self.filter_row_ids(filters or {}))
+        if order == "asc":
+            start = bisect.bisect_right(entries, decode_cursor(cursor, sort, order)) if cursor else 0
+            selected = entries[start:start + limit]
+            has_more = start + limit < len(entries)
+        else:
+            end = bisect.bisect_left(entries, decode_cursor(cursor, sort, order)) if cursor else len(entries)
+            selected = entries[max(0, end - limit):end][::-1]
+            has_more = end - limit > 0
+
+        return {
+            "rows": [dict(self.rows[row_id], row_id=row_id) for _, row_id in selected],
+            "next_cursor": encode_cursor(sort, order, selected[-1]) if selected and has_more else None,
+            "total_rows": len(entries),
+            "sort": sort,
+            "order": order,
+        }
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+def get_index(key: str, version: str, load_result) -> FeedbackIndex:
+    """Index for key at version, building it from load_result() on a miss"""
+    with _indexes_lock:
+        cached = _indexes.get(key)
+        if cached and version is not None and cached[0] == version:
+            _indexes.move_to_end(key)
+            return cached[1]
+
+    result = load_result()
+    if not result or result.get("all_data") is None:
+        return None
+    rows = result["all_data"]
+    index = FeedbackIndex(rows, result.get("processing_info"), result.get("rollups"), result.get("student_index"),
+                          result.get("instructor_index"), result.get("search_index"), result.get("aggregates"),
+                          result.get("changes"))
+    if version is not None:
+        with _indexes_lock:
+            _indexes[key] = (version, index)
+            _indexes.move_to_end(key)
+            while len(_indexes) > INDEX_CACHE_MAX_ENTRIES:
+                _indexes.popitem(last=False)
+        logger.info(f"Built row index for {key} ({len(rows)} rows)")
+    return index
+
+def invalidate_index(key: str = None):
+    """Drop one cached index, or all of them when key is None"""
+    with _indexes_lock:
+        if key is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(key, None)
+
+# ---------------- Persisted Postings ----------------
+# Posting lists stored with the checkpoint (the student and instructor
+# indexes), from a key to ascending row ids in all_data, plus the flagged row
+# ids per key so flagged subsets need no row scan:
+#   {"version": 2, "rows": 5644, "postings": {key: [row ids]}, "flagged": {key: [row ids]}}
+# "flagged" only holds keys with flagged rows. A refresh that only appends rows
+# appends their ids to the postings they touch; removals or reordering shift
+# row ids, so the postings are rebuilt in one pass. Version 1 was the student
+# index's original layout.
+POSTINGS_VERSION = 2
+
+def empty_postings_index() -> dict:
+    return {"version": POSTINGS_VERSION, "rows": 0, "postings": {}, "flagged": {}}
+
+def postings_index_matches(index, rows: list) -> bool:
+    """Whether stored postings are in the current format and cover exactly these rows"""
+    return isinstance(index, dict) and index.get("version") == POSTINGS_VERSION and index.get("rows") == len(rows)
+
+def extend_postings_index(index: dict, rows: list, keys, start: int = 0) -> dict:
+    """Postings with rows[start:] (keyed by keys, None to skip a row) appended
+
+    Postings that change are copied, so index itself is left untouched.
+    """
+    postings, flagged = dict(index["postings"]), dict(index["flagged"])
+    copied = set()
+    for row_id, (row, key) in enumerate(zip(rows[start:], keys), start):
+        if key is None:
+            continue
+        if key not in copied:
+            postings[key] = list(postings.get(key, ()))
+            flagged[key] = list(flagged.get(key, ()))
+            copied.add(key)
+        postings[key].append(row_id)
+        if row.get("is_flagged"):
+            flagged[key].append(row_id)
+    for key in copied:
+        if not flagged[key]:
+            del flagged[key]
+    return {"version": POSTINGS_VERSION, "rows": len(rows), "postings": postings, "flagged": flagged}
+
+def rows_appended(old_rows: list, new_rows: list, added: list, removed: list) -> bool:
+    """Whether a refresh (added / removed from diff_rows) only appended rows, so old row ids still hold"""
+    start = len(old_rows)
+    return (not removed and len(added) == len(new_rows) - start
+            and all(row is new_row for row, new_row in zip(added, new_rows[start:])))
+
+def update_postings_index(index, old_rows: list, new_rows: list, added: list, removed: list, keys_of) -> dict:
+    """Postings for new_rows, appending to index when the refresh only appended rows; keys_of(rows) gives row keys"""
+    start = len(old_rows)
+    if rows_appended(old_rows, new_rows, added, removed) and postings_index_matches(index, old_rows):
+        return extend_postings_index(index, new_rows, keys_of(new_rows[start:]), start)
+    return extend_postings_index(empty_postings_index(), new_rows, keys_of(new_rows))
+
+def instructor_keys(rows: list) -> list:
+    """Instructor posting keys, normalized like the in-memory postings"""
+    return [normalize_value(row.get("instructor")) for row in rows]
+
+def build_instructor_index(rows: list) -> dict:
+    return extend_postings_index(empty_postings_index(), rows, instructor_keys(rows))
+
+def update_instructor_index(index, old_rows: list, new_rows: list, added: list, removed: list) -> dict:
+    return update_postings_index(index, old_rows, new_rows, added, removed, instructor_keys)
+
+# ---------------- Filters ----------------
+def parse_filters(start_date: str = None, end_date: str = None, instructor: str = None,
+                  sentiment: str = None, college: str = None) -> dict:
+    """Validate request filters; dates are YYYY-MM-DD and the end date is inclusive"""
+    filters = {}
+    for name, value in (("start", start_date), ("end", end_date)):
+        if value:
+            try:
+                day = datetime.strptime(value.strip()[:10], "%Y-%m-%d")
+            except ValueError:
+                raise ValueError(f"Invalid {name} date '{value}', expected YYYY-MM-DD")
+            filters[name] = (day + timedelta(days=1 if name == "end" else 0)).timestamp()
+            filters[f"{name}_date"] = value.strip()[:10]
+    if sentiment and normalize_value(sentiment) not in ("positive", "negative", "neutral"):
+        raise ValueError("sentiment must be positive, negative or neutral")
+    for field, value in (("instructor", instructor), ("sentiment", sentiment), ("college", college)):
+        if value and value.strip():
+            filters[field] = value.strip()
+    return filters
+
+def row_matches(row: dict, filters: dict) -> bool:
+    """Evaluate filters against a single row (for rows that are not indexed, e.g. streams)"""
+    if not filters:
+        return True
+    if filters.get("start") is not None or filters.get("end") is not None:
+        ts = parse_timestamp(row.get("timestamp"))
+        if ts is None:
+            return False
+        if filters.get("start") is not None and ts < filters["start"]:
+            return False
+        if filters.get("end") is not None and ts >= filters["end"]:
+            return False
+    for field in FILTER_FIELDS:
+        if filters.get(field) and normalize_value(row.get(field)) != normalize_value(filters[field]):
+            return False
+    return True
+
+def describe_filters(filters: dict) -> dict:
+    """Filters as echoed back to the client"""
+    return {
+        "startDate": filters.get("start_date"),
+        "endDate": filters.get("end_date"),
+        "instructor": filters.get("instructor"),
+        "sentiment": filters.get("sentiment"),
+        "college": filters.get("college"),
+    }
+
+def filtered_result(index: FeedbackIndex, filters: dict) -> dict:
+    """Aggregates, flagged entries and rows for the rows matching filters"""
+    row_ids = index.filter_row_ids(filters)
+    rows = index.rows if row_ids is None else [index.rows[row_id] for row_id in row_ids]
+    return {
+        "summary": build_summary(rows),
+        "instructor_stats": build_instructor_stats(rows),
+        "flagged_row_ids": index.flagged_ids(row_ids),
+        "all_data": rows,
+        "filters": describe_filters(filters),
+        "processing_info": dict(index.processing_info),
+    }
+
+# ---------------- Flagged Entries ----------------
+def flagged_entry(row: dict) -> dict:
+    """A processed row in the flagged_entries shape"""
+    return {
+        "student_name": row["student_name"],
+        "instructor": row["instructor"],
+        "feedback": row["session_feedback"],
+        "rating": row["rating"],
+        "sentiment": row["sentiment"],
+        "confidence": row["confidence"],
+        "timestamp": row["timestamp"],
+    }
+
+def flagged_order_ids(rows: list, limit: int = None) -> list:
+    """Positions of flagged rows, highest confidence (then newest) first; a heap when limited"""
+    flagged = ((flagged_key(row), position) for position, row in enumerate(rows) if row.get("is_flagged"))
+    ordered = heapq.nlargest(limit, flagged) if limit is not None else sorted(flagged, reverse=True)
+    return [position for _, position in ordered]
+
+def build_flagged_entries(rows: list, limit: int = None) -> list:
+    """Flagged rows in the flagged_entries shape, highest confidence (then newest) first"""
+    return [flagged_entry(rows[position]) for position in flagged_order_ids(rows, limit)]
+
+def merge_flagged_ids(rows: list, existing: list, added: list) -> list:
+    """Merge two lists of positions in rows that are each already in flagged order"""
+    return list(heapq.merge(existing, added, key=lambda position: flagged_key(rows[position]), reverse=True))
+
+# ---------------- Response Views ----------------
+# Results are stored and passed around normalized: every row is held once in
+# all_data and flagged rows are "flagged_row_ids", positions in all_data in
+# flagged order. compat_result() expands them into the flagged_entries list
+# that responses have always carried.
+INTERNAL_KEYS = ("aggregates", "rollups", "student_index", "instructor_index", "search_index", "changes")
+
+def normalized_result(result: dict) -> dict:
+    """Result with flagged_entries replaced by flagged_row_ids (results without all_data are left as-is)"""
+    if "flagged_entries" not in result or result.get("all_data") is None:
+        return result
+    flagged_row_ids = flagged_order_ids(result["all_data"])
+    return {("flagged_row_ids" if k == "flagged_entries" else k): (flagged_row_ids if k == "flagged_entries" else v)
+            for k, v in result.items()}
+
+def compat_result(result: dict) -> dict:
+    """Result with flagged_row_ids expanded into flagged_entries, the original response shape"""
+    if "flagged_row_ids" not in result:
+        return result
+    rows = result["all_data"]
+    return {("flagged_entries" if k == "flagged_row_ids" else k):
+            ([flagged_entry(rows[position]) for position in v] if k == "flagged_row_ids" else v)
+            for k, v in result.items()}
+
+def public_result(result: dict) -> dict:
+    """Result without the bookkeeping that is only kept for the next refresh"""
+    if not any(key in result for key in INTERNAL_KEYS):
+        return result
+    return {k: v for k, v in result.items() if k not in INTERNAL_KEYS}
+
+def summary_view(result: dict) -> dict:
+    """Result without row payloads, for rendering the summary cards first"""
+    view = {k: v for k, v in result.items()
+            if k not in ("all_data", "flagged_entries", "flagged_row_ids") + INTERNAL_KEYS}
+    view["total_rows"] = len(result.get("all_data", []))
+    view["flagged_count"] = len(result.get("flagged_row_ids", result.get("flagged_entries", [])))
+    return view
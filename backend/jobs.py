@@ -0,0 +1,120 @@
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Background Jobs ----------------
+# Sheet and CSV processing runs on a bounded worker pool that is separate from
+# the web server's request threads. Each job records the stage it reached so
+# clients can poll it or follow it over Server-Sent Events.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_MAX_PENDING = int(os.environ.get("JOB_MAX_PENDING", "50"))
+JOB_HISTORY = int(os.environ.get("JOB_HISTORY", "200"))
+JOB_STAGES = ("queued", "fetched", "rows_parsed", "rows_scored", "aggregates", "saved", "done")
+FINISHED_STATUSES = ("succeeded", "failed")
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="feedback-job")
+_jobs = OrderedDict()
+_active = {}
+_lock = threading.Lock()
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already waiting for a worker"""
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+def _snapshot(job: dict) -> dict:
+    return {k: (dict(v) if isinstance(v, dict) else v) for k, v in job.items()}
+
+def _update(job_id: str, **changes):
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return
+        progress = changes.pop("progress", None)
+        if progress:
+            job["progress"].update(progress)
+        job.update(changes)
+        job["updated_at"] = _now()
+        job["seq"] += 1
+
+def _prune():
+    """Forget the oldest finished jobs beyond JOB_HISTORY (caller holds _lock)"""
+    finished = [job_id for job_id, job in _jobs.items() if job["status"] in FINISHED_STATUSES]
+    for job_id in finished[:max(0, len(_jobs) - JOB_HISTORY)]:
+        del _jobs[job_id]
+
+def submit_job(kind: str, target: str, fn) -> dict:
+    """Queue fn(report) for target; reuses the job already active for that target"""
+    with _lock:
+        active_id = _active.get((kind, target))
+        if active_id in _jobs:
+            return _snapshot(_jobs[active_id])
+        pending = sum(1 for job in _jobs.values() if job["status"] == "queued")
+        if pending >= JOB_MAX_PENDING:
+            raise JobQueueFull(f"{pending} jobs are already queued")
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "kind": kind,
+            "target": target,
+            "status": "queued",
+            "stage": "queued",
+            "progress": {},
+            "result": None,
+            "error": None,
+            "created_at": _now(),
+            "updated_at": _now(),
+            "seq": 0,
+        }
+        _jobs[job_id] = job
+        _active[(kind, target)] = job_id
+        _prune()
+        snapshot = _snapshot(job)
+
+    _executor.submit(_run_job, job_id, kind, target, fn)
+    logger.info(f"Queued {kind} job {job_id} for {target}")
+    return snapshot
+
+def _run_job(job_id: str, kind: str, target: str, fn):
+    def report(stage: str, **progress):
+        _update(job_id, stage=stage, progress=progress)
+
+    _update(job_id, status="running")
+    try:
+        result = fn(report)
+        _update(job_id, status="succeeded", stage="done", result=result)
+        logger.info(f"Job {job_id} for {target} finished")
+    except Exception as e:
+        logger.error(f"Job {job_id} for {target} failed: {str(e)}")
+        _update(job_id, status="failed", error=str(e))
+    finally:
+        with _lock:
+            if _active.get((kind, target)) == job_id:
+                del _active[(kind, target)]
+
+def get_job(job_id: str):
+    """Snapshot of a job, or None if unknown"""
+    with _lock:
+        job = _jobs.get(job_id)
+        return _snapshot(job) if job else None
+
+def job_stats() -> dict:
+    with _lock:
+        statuses = [job["status"] for job in _jobs.values()]
+    return {
+        "workers": JOB_WORKERS,
+        "queued": statuses.count("queued"),
+        "running": statuses.count("running"),
+    }
+
+def shutdown_jobs(wait: bool = True):
+    """Stop accepting work and optionally wait for running jobs"""
+    _executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -1,21 +1,62 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, File, HTTPException, Query, Request, Response, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import pandas as pd
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 from textblob import TextBlob
+from pydantic import BaseModel
+import asyncio
+import hashlib
+import io
 import logging
 import os
 import json
 from datetime import datetime
+from serialization import dumps
+from checkpoint_store import read_checkpoint, checkpoint_lock, CheckpointCorrupt
+from checkpoint_writer import (
+    schedule_write, pending_checkpoint, has_pending_write, checkpoint_version, discard_pending, flush_writes,
+    writer_stats,
+)
+from response_cache import (
+    get_cached_response, store_cached_response, response_payload, invalidate_cached_response,
+    negotiate_encoding, compress_body, make_etag, encoded_etag, etag_matches, GZIP_MIN_BYTES,
+)
+from feedback_index import (
+    get_index, invalidate_index, summary_view, public_result, parse_filters, filtered_result, describe_filters,
+    flagged_order_ids, normalized_result, compat_result, normalize_value, postings_index_matches,
+    build_instructor_index, update_instructor_index,
+)
+from aggregation import (
+    build_aggregates, aggregates_match, apply_rows, copy_aggregates, diff_rows, summary_from_aggregates, instructor_stats_from_aggregates,
+)
+from rollups import build_rollups, rollups_match, copy_rollups, apply_rollup_rows, trend_series
+from change_log import new_change_log, change_log_valid, record_changes, changes_since
+from search_index import build_search_index, search_index_matches, update_search_index, TextSearch
+from student_index import (
+    build_student_index, student_index_matches, update_student_index, student_history, repeated_complainers,
+)
+from row_encoding import parse_fields, encode_rows
+from streaming import MEDIA_TYPES, iter_export
+from jobs import submit_job, get_job, job_stats, shutdown_jobs, JobQueueFull, FINISHED_STATUSES
+from executors import run_io, run_cpu, run_refresh, executor_stats, shutdown_executors, IO_WORKERS
+from cache_policy import get_cache_policy, freshness
+from campuses import get_campuses, header_meta, campus_meta, header_campus, campus_summary, overall_summary
+from single_flight import single_flight, single_flight_async
 
 # ---------------- Logging ----------------
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # ---------------- FastAPI App ----------------
-app = FastAPI(title="Feedback Insights API")
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the shared fast encoder"""
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+app = FastAPI(title="Feedback Insights API", default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,8 +64,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+@app.middleware("http")
+async def compress_json_responses(request: Request, call_next):
+    """gzip/brotli-encode large JSON responses that are not already encoded"""
+    response = await call_next(request)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    if (not encoding or "content-encoding" in response.headers
+            or not response.headers.get("content-type", "").startswith("application/json")):
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    if len(body) >= GZIP_MIN_BYTES:
+        body = await run_cpu(compress_body, body, encoding)
+        headers["content-encoding"] = encoding
+        headers["vary"] = "Accept-Encoding"
+        if "etag" in headers:
+            headers["etag"] = encoded_etag(headers["etag"], encoding)
+    return Response(content=body, status_code=response.status_code, headers=headers)
+
 # ---------------- Checkpoint System ----------------
 CHECKPOINT_DIR = "checkpoints"
 os.makedirs(CHECKPOINT_DIR, exist_ok=True)
@@ -36,37 +97,67 @@ def load_checkpoint(sheet_id: str):
     """Load cached data from JSON file"""
     try:
         file_path = get_checkpoint_filename(sheet_id)
+        pending = pending_checkpoint(file_path)
+        if pending is not None:
+            return pending
         if os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                logger.info(f"Loaded checkpoint for sheet {sheet_id}")
-                return data
+            data = read_checkpoint(file_path)
+            logger.info(f"Loaded checkpoint for sheet {sheet_id}")
+            return normalized_result(data)
+    except CheckpointCorrupt as e:
+        logger.error(f"Checkpoint for {sheet_id} is corrupt, it will be reprocessed: {str(e)}")
     except Exception as e:
         logger.error(f"Error loading checkpoint for {sheet_id}: {str(e)}")
     return None
 
-def save_checkpoint(sheet_id: str, data: dict):
-    """Save processed data to JSON cache"""
+def save_checkpoint(sheet_id: str, data: dict, lock=None):
+    """Queue processed data for the background checkpoint writer, which releases lock once it is written"""
+    schedule_write(get_checkpoint_filename(sheet_id), data, header_meta(data), lock)
+
+def get_checkpoint_version(sheet_id: str):
+    """Version tag of the checkpoint (None if there is none)"""
+    return checkpoint_version(get_checkpoint_filename(sheet_id))
+
+def get_checkpoint_age_hours(sheet_id: str):
+    """Hours since the checkpoint was written (None if there is none)"""
     try:
         file_path = get_checkpoint_filename(sheet_id)
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        logger.info(f"Saved checkpoint for sheet {sheet_id}")
+        if has_pending_write(file_path):
+            return 0.0
+        return (datetime.now().timestamp() - os.stat(file_path).st_mtime) / 3600
+    except FileNotFoundError:
+        pass
     except Exception as e:
-        logger.error(f"Error saving checkpoint for {sheet_id}: {str(e)}")
+        logger.error(f"Error checking checkpoint age for {sheet_id}: {str(e)}")
+    return None
+
+# CSV uploads are stored under their content hash ("csv_<sha256>"): the same
+# bytes always give the same result and there is no sheet to refetch them
+# from, so their checkpoints never go stale and are never refreshed.
+CSV_DATASET_PREFIX = "csv_"
 
-def is_checkpoint_valid(sheet_id: str, max_age_hours: int = 24) -> bool:
+def is_csv_dataset(dataset_id: str) -> bool:
+    return dataset_id.startswith(CSV_DATASET_PREFIX)
+
+def get_checkpoint_state(sheet_id: str) -> str:
+    """'fresh', 'stale', 'expired' or 'missing' under the sheet's cache policy"""
+    age_hours = get_checkpoint_age_hours(sheet_id)
+    if age_hours is None:
+        return "missing"
+    if is_csv_dataset(sheet_id):
+        return "fresh"
+    return freshness(age_hours, get_cache_policy(sheet_id))
+
+def is_checkpoint_valid(sheet_id: str, max_age_hours: float = None) -> bool:
     """Check if checkpoint is still valid (not too old)"""
-    try:
-        file_path = get_checkpoint_filename(sheet_id)
-        if os.path.exists(file_path):
-            file_time = os.path.getmtime(file_path)
-            current_time = datetime.now().timestamp()
-            age_hours = (current_time - file_time) / 3600
-            return age_hours < max_age_hours
-    except Exception as e:
-        logger.error(f"Error checking checkpoint validity for {sheet_id}: {str(e)}")
-    return False
+    age_hours = get_checkpoint_age_hours(sheet_id)
+    if age_hours is None:
+        return False
+    if is_csv_dataset(sheet_id):
+        return True
+    if max_age_hours is None:
+        max_age_hours = get_cache_policy(sheet_id)["fresh_hours"]
+    return age_hours < max_age_hours
 
 # ---------------- Auth Setup ----------------
 scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
@@ -101,7 +192,22 @@ def is_negative_feedback(text, rating):
     return (analyze_sentiment(str(text))["sentiment"] == "negative") or (float(rating) < 3)
 
 # ---------------- Data Processing ----------------
-def process_dataframe(df, sheet_id: str = None):
+PROGRESS_EVERY_ROWS = 250
+
+def process_dataframe(df, sheet_id: str = None, progress=None, lock=None):
+    """Score every row and build the result; progress(stage, **counts) is called per stage
+
+    A held checkpoint lock passed in is handed to the checkpoint writer with the result.
+    """
+    if sheet_id and lock is None:
+        # The checkpoint is read, merged and rewritten below; hold its lock until the writer lands it
+        lock = get_checkpoint_lock(sheet_id).acquire()
+        try:
+            return process_dataframe(df, sheet_id, progress, lock)
+        except Exception:
+            lock.release()
+            raise
+    progress = progress or (lambda stage, **counts: None)
     # ✅ Standard column mapping
     column_mapping = {
         "Timestamp": ["timestamp", "date", "time"],
@@ -120,6 +226,7 @@ def process_dataframe(df, sheet_id: str = None):
             "additional_comments", "comments", "convey", "additional_feedback",
             "Anything you want to convey?","Anything you want to convey"
         ],
+        "College Name": ["college", "college_name", "campus", "Select the College", "College"],
     }
 
     # ✅ Clean empty cols like "", "_2"
@@ -132,9 +239,13 @@ def process_dataframe(df, sheet_id: str = None):
                 standardized_columns[standard_name] = col
                 break
 
-    processed_data, flagged_entries = [], []
+    processed_data = []
+    total_rows = len(df)
+    progress("rows_parsed", rows_total=total_rows, rows_scored=0)
 
-    for _, row in df.iterrows():
+    for position, (_, row) in enumerate(df.iterrows(), start=1):
+        if position % PROGRESS_EVERY_ROWS == 0:
+            progress("rows_scored", rows_total=total_rows, rows_scored=position)
         try:
             timestamp = row.get(standardized_columns.get("Timestamp", ""), "")
             email = row.get(standardized_columns.get("Email Address", ""), "")
@@ -143,6 +254,7 @@ def process_dataframe(df, sheet_id: str = None):
             instructor = row.get(standardized_columns.get("Select the Instructor", ""), "")
             rating = row.get(standardized_columns.get("How do you rate Session", ""), 0)
             additional_comments = row.get(standardized_columns.get("Anything you want to convey", ""), "")
+            college = row.get(standardized_columns.get("College Name", ""), "")
 
             analysis_text = str(feedback_text).strip()
             sentiment_result = analyze_sentiment(analysis_text)
@@ -161,79 +273,71 @@ def process_dataframe(df, sheet_id: str = None):
                 "sentiment_score": sentiment_result["combined_score"],
                 "is_flagged": is_flagged,
             }
+            if "College Name" in standardized_columns:
+                processed_entry["college"] = college
             processed_data.append(processed_entry)
-
-            if is_flagged:
-                flagged_entries.append({
-                    "student_name": student_name,
-                    "instructor": instructor,
-                    "feedback": feedback_text,
-                    "rating": processed_entry["rating"],
-                    "sentiment": sentiment_result["sentiment"],
-                    "confidence": sentiment_result["confidence"],
-                    "timestamp": timestamp,
-                })
         except Exception as e:
             logger.warning(f"Error processing row: {str(e)}")
             continue
 
-    # ✅ Summary stats
-    total_responses = len(processed_data)
-    sentiment_counts = {"positive": 0, "negative": 0, "neutral": 0}
-    total_rating, valid_ratings = 0, 0
-
-    for entry in processed_data:
-        sentiment_counts[entry["sentiment"]] += 1
-        if entry["rating"] > 0:
-            total_rating += entry["rating"]
-            valid_ratings += 1
-
-    average_rating = total_rating / valid_ratings if valid_ratings > 0 else 0
-
-    # ✅ Instructor stats
-    instructor_stats = {}
-    for entry in processed_data:
-        instructor = entry["instructor"]
-        if instructor not in instructor_stats:
-            instructor_stats[instructor] = {"total_responses": 0, "total_rating": 0, "valid_ratings": 0,
-                                            "negative_count": 0, "sentiment_scores": []}
-        stats = instructor_stats[instructor]
-        stats["total_responses"] += 1
-        if entry["rating"] > 0:
-            stats["total_rating"] += entry["rating"]
-            stats["valid_ratings"] += 1
-        if entry["sentiment"] == "negative":
-            stats["negative_count"] += 1
-        stats["sentiment_scores"].append(entry["sentiment_score"])
-
-    formatted_instructor_stats = []
-    for instructor, stats in instructor_stats.items():
-        avg_rating = stats["total_rating"] / stats["valid_ratings"] if stats["valid_ratings"] > 0 else 0
-        avg_sentiment = sum(stats["sentiment_scores"]) / len(stats["sentiment_scores"]) if stats["sentiment_scores"] else 0
-        formatted_instructor_stats.append({
-            "instructor": instructor,
-            "total_responses": stats["total_responses"],
-            "average_rating": round(avg_rating, 2),
-            "negative_count": stats["negative_count"],
-            "sentiment_score": round(avg_sentiment, 3),
-        })
-
-    formatted_instructor_stats.sort(key=lambda x: (-x["negative_count"], x["average_rating"]))
+    progress("aggregates", rows_total=total_rows, rows_scored=total_rows)
+
+    # ✅ Summary and instructor stats from running aggregates: only rows that changed since
+    # the last checkpoint are applied
+    previous = (load_checkpoint(sheet_id) if sheet_id else None) or {}
+    previous_rows = previous.get("all_data", [])
+    reuse_aggregates = aggregates_match(previous.get("aggregates"), previous_rows)
+    reuse_rollups = rollups_match(previous.get("rollups"), previous_rows)
+    reuse_students = student_index_matches(previous.get("student_index"), previous_rows)
+    reuse_instructors = postings_index_matches(previous.get("instructor_index"), previous_rows)
+    reuse_search = search_index_matches(previous.get("search_index"), previous_rows)
+    reuse_changes = change_log_valid(previous.get("changes")) and bool(previous_rows)
+    if reuse_aggregates or reuse_rollups or reuse_students or reuse_instructors or reuse_search or reuse_changes:
+        added, removed = diff_rows(previous_rows, processed_data)
+        logger.info(f"Updating sheet {sheet_id} from its checkpoint: {len(added)} rows added, {len(removed)} removed")
+    if reuse_aggregates:
+        aggregates = apply_rows(copy_aggregates(previous["aggregates"]), added, removed, processed_data)
+    else:
+        aggregates = build_aggregates(processed_data)
+    # ✅ Per-day / per-week rollup cells for /trends, maintained the same way
+    if reuse_rollups:
+        rollups = apply_rollup_rows(copy_rollups(previous["rollups"]), added, removed, processed_data)
+    else:
+        rollups = build_rollups(processed_data)
+    # ✅ Student -> row ids index for /students, appended to when rows were only appended
+    if reuse_students:
+        student_index = update_student_index(previous["student_index"], previous_rows, processed_data, added, removed)
+    else:
+        student_index = build_student_index(processed_data)
+    # ✅ Instructor -> row ids postings for the instructor drill-down, maintained the same way
+    if reuse_instructors:
+        instructor_index = update_instructor_index(previous["instructor_index"], previous_rows, processed_data,
+                                                   added, removed)
+    else:
+        instructor_index = build_instructor_index(processed_data)
+    # ✅ Inverted index over the feedback text for /search, appended to the same way
+    if reuse_search:
+        search_index = update_search_index(previous["search_index"], previous_rows, processed_data, added, removed)
+    else:
+        search_index = build_search_index(processed_data)
+    # ✅ Revision and change log for /changes; checkpoints without one start a new log
+    changes = record_changes(previous["changes"], added, removed) if reuse_changes else new_change_log()
 
     # ✅ Final Response with checkpoint info
     result = {
-        "summary": {
-            "total_responses": total_responses,
-            "negative_count": sentiment_counts["negative"],
-            "positive_count": sentiment_counts["positive"],
-            "neutral_count": sentiment_counts["neutral"],
-            "average_rating": round(average_rating, 2),
-        },
-        "instructor_stats": formatted_instructor_stats,
-        "flagged_entries": sorted(flagged_entries, key=lambda x: x["confidence"], reverse=True),
+        "summary": summary_from_aggregates(aggregates),
+        "instructor_stats": instructor_stats_from_aggregates(aggregates),
+        "flagged_row_ids": flagged_order_ids(processed_data),
         "all_data": processed_data,
+        "aggregates": aggregates,
+        "rollups": rollups,
+        "student_index": student_index,
+        "instructor_index": instructor_index,
+        "search_index": search_index,
+        "changes": changes,
         "processing_info": {
             "sheet_id": sheet_id,
+            "revision": changes["revision"],
             "processed_at": datetime.now().isoformat(),
             "cache_status": "fresh"
         }
@@ -241,55 +345,618 @@ def process_dataframe(df, sheet_id: str = None):
 
     # Save to checkpoint if sheet_id is provided
     if sheet_id:
-        save_checkpoint(sheet_id, result)
+        save_checkpoint(sheet_id, result, lock)
+        progress("saved")
 
     return result
 
+def fetch_sheet_dataframe(sheet_id: str):
+    """Fetch the first worksheet of a Google Sheet as a DataFrame"""
+    sheet = client.open_by_key(sheet_id)
+    worksheet = sheet.sheet1
+
+    # Get raw values including headers
+    raw_data = worksheet.get_all_values()
+    if not raw_data or len(raw_data) < 2:
+        raise ValueError("Sheet is empty or has no data")
+
+    # Fix duplicate or empty headers
+    headers = raw_data[0]
+    clean_headers = []
+    used = {}
+    for h in headers:
+        h_clean = h.strip() if h.strip() else "Column"
+        if h_clean in used:
+            used[h_clean] += 1
+            h_clean = f"{h_clean}_{used[h_clean]}"
+        else:
+            used[h_clean] = 0
+        clean_headers.append(h_clean)
+
+    # Convert to DataFrame
+    return pd.DataFrame(raw_data[1:], columns=clean_headers)
+
+def get_checkpoint_lock(dataset_id: str):
+    return checkpoint_lock(get_checkpoint_filename(dataset_id))
+
+def refresh_sheet(sheet_id: str, seen_version: str = None, progress=None):
+    """Fetch and process a sheet once, however many requests and worker processes ask at the same time"""
+    progress = progress or (lambda stage, **counts: None)
+
+    def work():
+        # Held until the new checkpoint is written: the checkpoint writer releases it
+        lock = get_checkpoint_lock(sheet_id).acquire()
+        try:
+            # Another worker process may have refreshed the sheet while this one waited for the lock
+            version = get_checkpoint_version(sheet_id)
+            if version is not None and version != seen_version:
+                cached_data = load_checkpoint(sheet_id)
+                if cached_data:
+                    lock.release()
+                    progress("saved", cache_status="coalesced")
+                    return cached_data
+            df = fetch_sheet_dataframe(sheet_id)
+            progress("fetched", rows_total=len(df))
+            return process_dataframe(df, sheet_id, progress=progress, lock=lock)
+        except Exception:
+            lock.release()
+            raise
+
+    return single_flight(f"sheet:{sheet_id}", work)
+
+# Cold refreshes in the async endpoint wait for the lock on the event loop, fetch on the
+# I/O pool and score on the refresh pool, one await per step, so no pool thread sits blocked
+# on another pool. At most half the I/O threads fetch at once; the rest stay free for
+# checkpoint and index loads behind cached reads.
+COLD_REFRESH_LIMIT = max(1, IO_WORKERS // 2)
+_cold_refreshes = asyncio.Semaphore(COLD_REFRESH_LIMIT)
+
+async def refresh_sheet_async(sheet_id: str, seen_version: str = None):
+    """refresh_sheet() for async endpoints"""
+    async with _cold_refreshes:
+        lock = await get_checkpoint_lock(sheet_id).acquire_async()
+        try:
+            version = get_checkpoint_version(sheet_id)
+            if version is not None and version != seen_version:
+                cached_data = await run_io(load_checkpoint, sheet_id)
+                if cached_data:
+                    lock.release()
+                    return cached_data
+            df = await run_io(fetch_sheet_dataframe, sheet_id)
+            return await run_refresh(process_dataframe, df, sheet_id, lock=lock)
+        except BaseException:
+            lock.release()
+            raise
+
 # ---------------- API Endpoint ----------------
+def cached_json_response(entry: dict, request: Request, etag: str = None) -> Response:
+    """Send pre-serialized JSON bytes as-is"""
+    body, headers = response_payload(entry, request.headers.get("accept-encoding", ""))
+    if etag:
+        headers["ETag"] = encoded_etag(etag, headers.get("Content-Encoding"))
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def json_response(data, etag: str = None) -> FastJSONResponse:
+    """JSON response carrying the checkpoint-derived ETag"""
+    return FastJSONResponse(content=data, headers={"ETag": etag} if etag else None)
+
+def request_etag(request: Request, sheet_id: str, version: str):
+    """Strong ETag for this request's variant of the checkpoint version"""
+    if version is None:
+        return None
+    variant = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items() if k != "force_refresh"))
+    return make_etag(f"{request.url.path}|{sheet_id}", version, variant)
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept-Encoding"})
+
+def render_view(result: dict, view: str, encoding: dict = None, flagged: str = "entries") -> dict:
+    """Shape a full result for the requested response view, flagged shape and row encoding"""
+    if view == "summary":
+        return summary_view(result)
+    result = public_result(result)
+    if flagged == "entries":
+        result = compat_result(result)
+    if encoding:
+        result = dict(result, all_data=encode_rows(result["all_data"], **encoding))
+    return result
+
+def get_sheet_index(sheet_id: str, result: dict = None):
+    """Row index for the sheet's current checkpoint (None if there is none)"""
+    return get_index(sheet_id, get_checkpoint_version(sheet_id),
+                     (lambda: result) if result is not None else (lambda: load_checkpoint(sheet_id)))
+
+def feedback_filters(start_date: str = Query(None, alias="startDate"), end_date: str = Query(None, alias="endDate"),
+                     instructor: str = None, sentiment: str = None, college: str = None) -> dict:
+    """Row filters shared by the feedback endpoints"""
+    try:
+        return parse_filters(start_date, end_date, instructor, sentiment, college)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def row_encoding(fields: str = None, encoding: str = Query("rows", pattern="^(rows|columnar)$"),
+                 precision: int = Query(None, ge=0, le=10)) -> dict:
+    """Field projection and row encoding options (empty dict for the default shape)"""
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if selected is None and encoding == "rows" and precision is None:
+        return {}
+    return {"fields": selected, "encoding": encoding, "precision": precision}
+
 @app.get("/feedback/{sheet_id}")
-def process_sheet(sheet_id: str, force_refresh: bool = False):
+async def process_sheet(sheet_id: str, request: Request, force_refresh: bool = False,
+                  view: str = Query("full", pattern="^(full|summary)$"),
+                  flagged: str = Query("entries", pattern="^(entries|ids)$"),
+                  filters: dict = Depends(feedback_filters), encoding: dict = Depends(row_encoding)):
+    """Processed feedback for a sheet; flagged=ids sends flagged rows as positions in all_data"""
+    if is_csv_dataset(sheet_id) and get_checkpoint_state(sheet_id) == "missing":
+        raise HTTPException(status_code=404, detail="CSV dataset not found; upload it again with POST /jobs/csv")
     try:
-        # Check if we have a valid cached version
-        if not force_refresh and is_checkpoint_valid(sheet_id):
-            cached_data = load_checkpoint(sheet_id)
-            if cached_data:
-                cached_data["processing_info"]["cache_status"] = "cached"
-                logger.info(f"Returning cached data for sheet {sheet_id}")
-                return cached_data
+        # Fresh checkpoints are served as-is; stale ones are served while a background refresh runs.
+        # CSV datasets have nothing to refresh from, so force_refresh does not apply to them
+        state = "missing" if force_refresh and not is_csv_dataset(sheet_id) else get_checkpoint_state(sheet_id)
+        if state in ("fresh", "stale"):
+            cache_status = "cached" if state == "fresh" else "stale"
+            if state == "stale":
+                queue_background_refresh(sheet_id)
+
+            # Revalidation only needs the checkpoint's stat() version
+            version = get_checkpoint_version(sheet_id)
+            etag = request_etag(request, sheet_id, version if state == "fresh" else f"{version}:stale")
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return not_modified(etag)
+
+            if filters:
+                index = await run_io(get_sheet_index, sheet_id)
+                if index is not None:
+                    filtered = await run_cpu(filtered_result, index, filters)
+                    filtered["processing_info"]["cache_status"] = cache_status
+                    return json_response(render_view(filtered, view, encoding, flagged), etag)
+
+            cache_key = f"{sheet_id}:{view}"
+            if encoding and view != "summary":
+                fields = ",".join(encoding["fields"] or [])
+                cache_key += f":{fields}:{encoding['encoding']}:{encoding['precision']}"
+            if flagged != "entries" and view != "summary":
+                cache_key += f":flagged={flagged}"
+            if state == "stale":
+                cache_key += ":stale"
+            entry = get_cached_response(cache_key, version)
+            if entry is None:
+                cached_data = await run_io(load_checkpoint, sheet_id)
+                if cached_data:
+                    cached_data["processing_info"]["cache_status"] = cache_status
+                    entry = await run_cpu(lambda: store_cached_response(
+                        cache_key, version, render_view(cached_data, view, encoding, flagged)))
+            if entry is not None:
+                logger.info(f"Returning {cache_status} data for sheet {sheet_id}")
+                return cached_json_response(entry, request, etag)
 
-        # Process fresh data from Google Sheets
+        # Process fresh data from Google Sheets; concurrent requests for the sheet share one refresh
         logger.info(f"Processing fresh data for sheet {sheet_id}")
-        sheet = client.open_by_key(sheet_id)
-        worksheet = sheet.sheet1
-
-        # Get raw values including headers
-        raw_data = worksheet.get_all_values()
-        if not raw_data or len(raw_data) < 2:
-            raise HTTPException(status_code=404, detail="Sheet is empty or has no data")
-
-        # Fix duplicate or empty headers
-        headers = raw_data[0]
-        clean_headers = []
-        used = {}
-        for h in headers:
-            h_clean = h.strip() if h.strip() else "Column"
-            if h_clean in used:
-                used[h_clean] += 1
-                h_clean = f"{h_clean}_{used[h_clean]}"
-            else:
-                used[h_clean] = 0
-            clean_headers.append(h_clean)
-
-        # Convert to DataFrame
-        df = pd.DataFrame(raw_data[1:], columns=clean_headers)
-
-        result = process_dataframe(df, sheet_id)
-        return result
+        seen_version = get_checkpoint_version(sheet_id)
+        result = await single_flight_async(f"sheet:{sheet_id}", refresh_sheet_async, sheet_id, seen_version)
+        if filters:
+            result = await run_cpu(lambda: filtered_result(get_sheet_index(sheet_id, result), filters))
+        # Fresh and cached bodies differ in cache_status, so they get different tags
+        etag = request_etag(request, sheet_id, f"{get_checkpoint_version(sheet_id)}:fresh")
+        return json_response(render_view(result, view, encoding, flagged), etag)
 
     except Exception as e:
         logger.error(f"Error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to process sheet: {str(e)}")
 
+@app.get("/feedback/{sheet_id}/rows")
+async def get_feedback_rows(sheet_id: str, request: Request, cursor: str = None, limit: int = Query(100, ge=1, le=1000),
+                      sort: str = Query("timestamp", pattern="^(timestamp|confidence)$"),
+                      order: str = Query("desc", pattern="^(asc|desc)$"),
+                      filters: dict = Depends(feedback_filters), encoding: dict = Depends(row_encoding)):
+    """Page through a sheet's processed rows from the cached checkpoint"""
+    etag = request_etag(request, sheet_id, get_checkpoint_version(sheet_id))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    index = await run_io(get_sheet_index, sheet_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Checkpoint not found")
+    try:
+        page = await run_cpu(index.page, sort=sort, order=order, cursor=cursor, limit=limit, filters=filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if encoding:
+        page["rows"] = await run_cpu(encode_rows, page["rows"], **encoding)
+    page["sheet_id"] = sheet_id
+    return json_response(page, etag)
+
+@app.get("/feedback/{sheet_id}/export")
+async def export_feedback_rows(sheet_id: str, request: Request,
+                         export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+                         fields: str = None, filters: dict = Depends(feedback_filters)):
+    """Stream every (filtered) row as NDJSON or CSV without building one big payload"""
+    etag = request_etag(request, sheet_id, get_checkpoint_version(sheet_id))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    index = await run_io(get_sheet_index, sheet_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Checkpoint not found")
+    row_ids = await run_cpu(index.filter_row_ids, filters)
+    rows = index.rows if row_ids is None else (index.rows[row_id] for row_id in row_ids)
+
+    headers = {"ETag": etag} if etag else {}
+    if export_format == "csv":
+        headers["Content-Disposition"] = f'attachment; filename="feedback_{sheet_id}.csv"'
+    return StreamingResponse(iter_export(rows, export_format, selected), media_type=MEDIA_TYPES[export_format],
+                             headers=headers)
+
+@app.get("/feedback/{sheet_id}/flagged")
+async def get_flagged_entries(sheet_id: str, request: Request, cursor: str = None,
+                              limit: int = Query(50, ge=1, le=1000), filters: dict = Depends(feedback_filters)):
+    """Page through flagged rows, highest confidence (then newest) first, from the row index"""
+    etag = request_etag(request, sheet_id, get_checkpoint_version(sheet_id))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    index = await run_io(get_sheet_index, sheet_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Checkpoint not found")
+    try:
+        page = await run_cpu(index.flagged_page, cursor=cursor, limit=limit, filters=filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    page["sheet_id"] = sheet_id
+    return json_response(page, etag)
+
+def get_sheet_rollups(sheet_id: str):
+    """Rollup cubes for the sheet's current checkpoint; built from the rows once for older checkpoints"""
+    index = get_sheet_index(sheet_id)
+    if index is None:
+        return None
+    if not rollups_match(index.rollups, index.rows):
+        index.rollups = build_rollups(index.rows)
+    return index.rollups
+
+@app.get("/feedback/{sheet_id}/trends")
+async def get_feedback_trends(sheet_id: str, request: Request,
+                              granularity: str = Query("day", pattern="^(day|week|month)$"),
+                              start_date: str = Query(None, alias="startDate"),
+                              end_date: str = Query(None, alias="endDate"),
+                              instructor: str = None, by_instructor: bool = False):
+    """Per-day, per-week or per-month series summed from the sheet's rollup cells"""
+    etag = request_etag(request, sheet_id, get_checkpoint_version(sheet_id))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    try:
+        filters = parse_filters(start_date, end_date, instructor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rollups = await run_io(get_sheet_rollups, sheet_id)
+    if rollups is None:
+        raise HTTPException(status_code=404, detail="Checkpoint not found")
+    series = await run_cpu(trend_series, rollups, granularity, filters.get("start_date"), filters.get("end_date"),
+                           filters.get("instructor"), by_instructor)
+    return json_response({
+        "sheet_id": sheet_id,
+        "granularity": granularity,
+        "filters": describe_filters(filters),
+        "series": series,
+        "undated_rows": rollups["undated"],
+    }, etag)
+
+def build_instructor_detail(index, rollups: dict, name: str, cursor: str, limit: int, order: str,
+                            flagged_limit: int, granularity: str):
+    """One instructor's stats, row page, top flagged rows and trend series (None if the sheet has no such instructor)"""
+    row_ids = index.postings("instructor").get(normalize_value(name))
+    if not row_ids:
+        return None
+    filters = {"instructor": name}
+    page = index.page(sort="timestamp", order=order, cursor=cursor, limit=limit, filters=filters)
+    flagged = index.flagged_page(limit=flagged_limit, filters=filters)
+    return {
+        "instructor": index.rows[row_ids[0]]["instructor"],
+        "summary": dict(summary_from_aggregates(build_aggregates([index.rows[row_id] for row_id in row_ids])),
+                        flagged_count=flagged["total_flagged"]),
+        "rows": page["rows"],
+        "next_cursor": page["next_cursor"],
+        "total_rows": page["total_rows"],
+        "order": order,
+        "flagged_entries": flagged["flagged_entries"],
+        "flagged_next_cursor": flagged["next_cursor"],
+        "trend": {"granularity": granularity, "series": trend_series(rollups, granularity, instructor=name)},
+    }
+
+@app.get("/feedback/{sheet_id}/instructors/{name}")
+async def get_instructor_detail(sheet_id: str, name: str, request: Request, cursor: str = None,
+                                limit: int = Query(50, ge=1, le=1000),
+                                order: str = Query("desc", pattern="^(asc|desc)$"),
+                                flagged_limit: int = Query(20, ge=1, le=1000),
+                                granularity: str = Query("week", pattern="^(day|week|month)$")):
+    """Instructor drill-down from the instructor posting list; rows page with cursor, flagged rows
+    continue on /feedback/{sheet_id}/flagged?instructor=... with flagged_next_cursor"""
+    etag = request_etag(request, sheet_id, get_checkpoint_version(sheet_id))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    index = await run_io(get_sheet_index, sheet_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Checkpoint not found")
+    rollups = await run_io(get_sheet_rollups, sheet_id)
+    try:
+        detail = await run_cpu(build_instructor_detail, index, rollups, name, cursor, limit, order, flagged_limit,
+                               granularity)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if detail is None:
+        raise HTTPException(status_code=404, detail="Instructor not found")
+    detail["sheet_id"] = sheet_id
+    return json_response(detail, etag)
+
+@app.get("/feedback/{sheet_id}/changes")
+async def get_feedback_changes(sheet_id: str, request: Request, since: int = Query(..., ge=0)):
+    """Rows inserted, updated or deleted since a revision (processing_info.revision), plus current stats"""
+    etag = request_etag(request, sheet_id, get_checkpoint_version(sheet_id))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    if get_checkpoint_state(sheet_id) == "stale":
+        queue_background_refresh(sheet_id)
+
+    index = await run_io(get_sheet_index, sheet_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Checkpoint not found")
+    if not change_log_valid(index.change_log):
+        # Written before change logs existed: the next refresh starts one
+        return json_response({"sheet_id": sheet_id, "since": since, "revision": None, "full_sync_required": True}, etag)
+
+    changes = await run_cpu(changes_since, index.change_log, since, index.rows, index.row_key_ids)
+    body = {"sheet_id": sheet_id, "since": since, "revision": index.change_log["revision"], **changes}
+    if changes.get("up_to_date") is False:
+        aggregates = index.aggregates if aggregates_match(index.aggregates, index.rows) else build_aggregates(index.rows)
+        body.update(summary=summary_from_aggregates(aggregates), instructor_stats=instructor_stats_from_aggregates(aggregates),
+                    total_rows=len(index.rows), flagged_count=len(index.flagged_row_ids()))
+    return json_response(body, etag)
+
+def get_sheet_search(sheet_id: str):
+    """Text search over the sheet's current checkpoint; the index is built once for older checkpoints"""
+    index = get_sheet_index(sheet_id)
+    if index is None:
+        return None
+    if index.text_search is None:
+        if not search_index_matches(index.search_index, index.rows):
+            index.search_index = build_search_index(index.rows)
+        index.text_search = TextSearch(index, index.search_index)
+    return index.text_search
+
+@app.get("/feedback/{sheet_id}/search")
+async def search_feedback(sheet_id: str, request: Request, q: str = Query(..., min_length=1),
+                          limit: int = Query(50, ge=1, le=1000), offset: int = Query(0, ge=0),
+                          start_date: str = Query(None, alias="startDate"), end_date: str = Query(None, alias="endDate"),
+                          instructor: str = None):
+    """Rows whose feedback or comments match a boolean / phrase query, newest first"""
+    etag = request_etag(request, sheet_id, get_checkpoint_version(sheet_id))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    try:
+        filters = parse_filters(start_date, end_date, instructor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    search = await run_io(get_sheet_search, sheet_id)
+    if search is None:
+        raise HTTPException(status_code=404, detail="Checkpoint not found")
+    try:
+        results = await run_cpu(search.search, q, filters, limit, offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    results.update(sheet_id=sheet_id, query=q, filters=describe_filters(filters))
+    return json_response(results, etag)
+
+def get_sheet_student_index(sheet_id: str):
+    """Row index and student index for the sheet's current checkpoint; the latter built once for older checkpoints"""
+    index = get_sheet_index(sheet_id)
+    if index is None:
+        return None, None
+    if not student_index_matches(index.student_index, index.rows):
+        index.student_index = build_student_index(index.rows)
+    return index, index.student_index
+
+@app.get("/feedback/{sheet_id}/students/{student}")
+async def get_student_history(sheet_id: str, student: str, request: Request):
+    """One student's rows and daily sentiment trend, looked up by email (or name) in the student index"""
+    etag = request_etag(request, sheet_id, get_checkpoint_version(sheet_id))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    index, student_index = await run_io(get_sheet_student_index, sheet_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Checkpoint not found")
+    history = await run_cpu(student_history, student_index, index.rows, student)
+    if history is None:
+        raise HTTPException(status_code=404, detail="Student not found")
+    history["sheet_id"] = sheet_id
+    return json_response(history, etag)
+
+@app.get("/feedback/{sheet_id}/repeat-complainers")
+async def get_repeat_complainers(sheet_id: str, request: Request, min_flagged: int = Query(2, ge=1),
+                                 limit: int = Query(50, ge=1, le=1000)):
+    """Students with several flagged rows, most flagged first, from the student index"""
+    etag = request_etag(request, sheet_id, get_checkpoint_version(sheet_id))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    index, student_index = await run_io(get_sheet_student_index, sheet_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Checkpoint not found")
+    complainers = await run_cpu(repeated_complainers, student_index, index.rows, min_flagged, limit)
+    complainers["sheet_id"] = sheet_id
+    return json_response(complainers, etag)
+
+# ---------------- Processing Jobs ----------------
+class SheetJobRequest(BaseModel):
+    sheet_id: str
+    force_refresh: bool = False
+
+def job_links(job: dict) -> dict:
+    return dict(job, status_url=f"/jobs/{job['job_id']}", events_url=f"/jobs/{job['job_id']}/events")
+
+def job_result(dataset_id: str, result: dict) -> dict:
+    return {"sheet_id": dataset_id, "summary": result["summary"], "feedback_url": f"/feedback/{dataset_id}"}
+
+def queue_job(kind: str, target: str, fn):
+    try:
+        return FastJSONResponse(content=job_links(submit_job(kind, target, fn)), status_code=202)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Job queue is full: {str(e)}")
+
+def sheet_job(sheet_id: str, force_refresh: bool = False):
+    """Job body that (re)processes a sheet unless a fresh checkpoint exists"""
+    def run(report):
+        if not force_refresh and is_checkpoint_valid(sheet_id):
+            cached_data = load_checkpoint(sheet_id)
+            if cached_data:
+                report("saved", cache_status="cached")
+                return job_result(sheet_id, cached_data)
+        seen_version = get_checkpoint_version(sheet_id)
+        return job_result(sheet_id, refresh_sheet(sheet_id, seen_version, progress=report))
+    return run
+
+STALE_REFRESH_RETRY_SECONDS = int(os.environ.get("STALE_REFRESH_RETRY_SECONDS", "300"))
+last_refresh_queued = {}
+
+def queue_background_refresh(sheet_id: str):
+    """Refresh a stale sheet in the background; at most one refresh per sheet runs at a time"""
+    if is_csv_dataset(sheet_id):
+        return
+    # A refresh that failed (or is still running) is not retried on every request
+    now = datetime.now().timestamp()
+    if now - last_refresh_queued.get(sheet_id, 0) < STALE_REFRESH_RETRY_SECONDS:
+        return
+    last_refresh_queued[sheet_id] = now
+    try:
+        submit_job("sheet", sheet_id, sheet_job(sheet_id, force_refresh=True))
+        logger.info(f"Queued background refresh for stale sheet {sheet_id}")
+    except JobQueueFull as e:
+        logger.error(f"Could not queue refresh for sheet {sheet_id}: {str(e)}")
+
+@app.post("/jobs")
+def create_sheet_job(body: SheetJobRequest):
+    """Process a sheet in the background; returns a job id immediately"""
+    sheet_id = body.sheet_id.strip()
+    if not sheet_id:
+        raise HTTPException(status_code=400, detail="sheet_id is required")
+    if is_csv_dataset(sheet_id):
+        raise HTTPException(status_code=400, detail="CSV datasets cannot be refreshed; upload the file with POST /jobs/csv")
+
+    return queue_job("sheet", sheet_id, sheet_job(sheet_id, body.force_refresh))
+
+@app.post("/jobs/csv")
+async def create_csv_job(file: UploadFile = File(...)):
+    """Process an uploaded CSV in the background; results are stored under its content hash"""
+    if not file.filename or not file.filename.lower().endswith(".csv"):
+        raise HTTPException(status_code=400, detail="File must be a CSV")
+    content = await file.read()
+    if not content.strip():
+        raise HTTPException(status_code=400, detail="CSV file is empty")
+    dataset_id = f"{CSV_DATASET_PREFIX}{hashlib.sha256(content).hexdigest()[:24]}"
+
+    def run(report):
+        def process():
+            lock = get_checkpoint_lock(dataset_id).acquire()
+            try:
+                # Same content hash, same result: reuse what another worker already stored
+                cached_data = load_checkpoint(dataset_id)
+                if cached_data:
+                    lock.release()
+                    report("saved", cache_status="cached")
+                    return cached_data
+                df = pd.read_csv(io.BytesIO(content), dtype=str, keep_default_na=False)
+                report("fetched", rows_total=len(df))
+                return process_dataframe(df, dataset_id, progress=report, lock=lock)
+            except Exception:
+                lock.release()
+                raise
+
+        return job_result(dataset_id, single_flight(f"csv:{dataset_id}", process))
+
+    return queue_job("csv", dataset_id, run)
+
+@app.get("/jobs/{job_id}")
+def get_job_status(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_links(job)
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Server-Sent Events with the job state on every stage change"""
+    if get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        last_seq, idle = None, 0.0
+        while True:
+            job = get_job(job_id)
+            if job is None:
+                return
+            if job["seq"] != last_seq:
+                last_seq, idle = job["seq"], 0.0
+                event = job["status"] if job["status"] in FINISHED_STATUSES else "progress"
+                yield f"event: {event}\ndata: {dumps(job_links(job)).decode('utf-8')}\n\n"
+                if job["status"] in FINISHED_STATUSES:
+                    return
+            elif idle >= 15:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(0.25)
+            idle += 0.25
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    shutdown_jobs(wait=False)
+    shutdown_executors(wait=False)
+    flush_writes(timeout=30)
+
+# ---------------- Campus Summary ----------------
+def get_sheet_campus_meta(sheet_id: str, version: str = None):
+    """A sheet's campus metadata from its queued write or its checkpoint header, without reading rows"""
+    file_path = get_checkpoint_filename(sheet_id)
+    pending = pending_checkpoint(file_path)
+    if pending is not None:
+        return campus_meta(pending["aggregates"]) if pending.get("aggregates") else None
+    return header_campus(file_path, version)
+
+def build_campuses_summary(campuses: list, versions: dict, limit: int) -> dict:
+    meta_by_sheet, entries = {}, []
+    for campus in campuses:
+        sheet_id = campus["sheet_id"]
+        if sheet_id not in meta_by_sheet:
+            meta_by_sheet[sheet_id] = get_sheet_campus_meta(sheet_id, versions.get(sheet_id))
+        # Checkpoints written before the header carried campus metadata report no summary until
+        # their next refresh, which /feedback schedules once they go stale; reads here never queue one
+        entries.append(campus_summary(campus, meta_by_sheet[sheet_id], get_checkpoint_state(sheet_id), limit))
+    return {"campuses": entries, "overall": overall_summary(meta_by_sheet)}
+
+@app.get("/campuses/summary")
+async def get_campuses_summary(request: Request, limit: int = Query(5, ge=1, le=50)):
+    """Headline metrics and instructor leaderboards for every registered campus"""
+    campuses = get_campuses()
+    versions = {campus["sheet_id"]: get_checkpoint_version(campus["sheet_id"]) for campus in campuses}
+    tag = ",".join(f"{sheet_id}={version}" for sheet_id, version in versions.items())
+    etag = make_etag(request.url.path, hashlib.sha1(tag.encode("utf-8")).hexdigest(), f"limit={limit}")
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    return json_response(await run_io(build_campuses_summary, campuses, versions, limit), etag)
+
 # ---------------- Checkpoint Management Endpoints ----------------
 @app.get("/checkpoints")
 def list_checkpoints():
@@ -306,7 +973,8 @@ def list_checkpoints():
                     "size_bytes": file_stats.st_size,
                     "created": datetime.fromtimestamp(file_stats.st_ctime).isoformat(),
                     "modified": datetime.fromtimestamp(file_stats.st_mtime).isoformat(),
-                    "is_valid": is_checkpoint_valid(filename.replace("checkpoint_", "").replace(".json", ""))
+                    "is_valid": is_checkpoint_valid(filename.replace("checkpoint_", "").replace(".json", "")),
+                    "state": get_checkpoint_state(filename.replace("checkpoint_", "").replace(".json", "")),
                 })
         return {"checkpoints": checkpoints}
     except Exception as e:
@@ -314,12 +982,12 @@ def list_checkpoints():
         raise HTTPException(status_code=500, detail="Failed to list checkpoints")
 
 @app.get("/checkpoint/{sheet_id}")
-def get_checkpoint(sheet_id: str):
+async def get_checkpoint(sheet_id: str):
     """Get cached data for a specific sheet"""
     try:
-        cached_data = load_checkpoint(sheet_id)
+        cached_data = await run_io(load_checkpoint, sheet_id)
         if cached_data:
-            return cached_data
+            return compat_result(public_result(cached_data))
         else:
             raise HTTPException(status_code=404, detail="Checkpoint not found")
     except Exception as e:
@@ -331,8 +999,11 @@ def delete_checkpoint(sheet_id: str):
     """Delete cached data for a specific sheet"""
     try:
         file_path = get_checkpoint_filename(sheet_id)
+        discard_pending(file_path)
         if os.path.exists(file_path):
             os.remove(file_path)
+            invalidate_cached_response(sheet_id)
+            invalidate_index(sheet_id)
             logger.info(f"Deleted checkpoint for sheet {sheet_id}")
             return {"message": f"Checkpoint for {sheet_id} deleted successfully"}
         else:
@@ -346,11 +1017,14 @@ def clear_all_checkpoints():
     """Clear all cached data"""
     try:
         count = 0
+        discard_pending()
         for filename in os.listdir(CHECKPOINT_DIR):
             if filename.endswith(".json"):
                 file_path = os.path.join(CHECKPOINT_DIR, filename)
                 os.remove(file_path)
                 count += 1
+        invalidate_cached_response()
+        invalidate_index()
         logger.info(f"Cleared {count} checkpoints")
         return {"message": f"Cleared {count} checkpoints successfully"}
     except Exception as e:
@@ -359,12 +1033,15 @@ def clear_all_checkpoints():
 
 # ---------------- Health Check ----------------
 @app.get("/health")
-def health_check():
+async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "checkpoints_dir": CHECKPOINT_DIR,
-        "checkpoints_count": len([f for f in os.listdir(CHECKPOINT_DIR) if f.endswith(".json")])
+        "checkpoints_count": len([f for f in os.listdir(CHECKPOINT_DIR) if f.endswith(".json")]),
+        "jobs": job_stats(),
+        "executors": executor_stats(),
+        "checkpoint_writer": writer_stats(),
     }
 
 # ---------------- Server Startup ----------------
@@ -4,6 +4,8 @@ import sys
 from datetime import datetime
 from typing import List, Dict, Any
 import re
+from serialization import dumps
+from aggregation import aggregate_columns
 
 def clean_text(text: str) -> str:
     """Clean and normalize text data"""
@@ -110,43 +112,39 @@ def generate_summary_stats(processed_data: List[Dict[str, Any]]) -> Dict[str, An
     if total_responses == 0:
         return {}
     
-    # Count sentiments
-    positive_count = sum(1 for entry in processed_data if entry["sentiment_analysis"]["overall_sentiment"] == "positive")
-    negative_count = sum(1 for entry in processed_data if entry["sentiment_analysis"]["overall_sentiment"] == "negative")
+    # Counts and rating sums, overall and per instructor, in one grouped pass
+    aggregates = aggregate_columns(
+        [entry["instructor"] for entry in processed_data],
+        [entry["sentiment_analysis"]["overall_sentiment"] for entry in processed_data],
+        [entry["rating"] for entry in processed_data],
+        flags=[entry["sentiment_analysis"]["is_flagged"] for entry in processed_data],
+    )
+    total = aggregates["total"]
+    positive_count, negative_count = total["positive"], total["negative"]
     neutral_count = total_responses - positive_count - negative_count
-    flagged_count = sum(1 for entry in processed_data if entry["sentiment_analysis"]["is_flagged"])
+    flagged_count = total["flagged"]
     
     # Rating statistics
     ratings = [entry["rating"] for entry in processed_data if entry["rating"] > 0]
-    avg_rating = sum(ratings) / len(ratings) if ratings else 0
+    avg_rating = total["rating_sum"] / total["valid_ratings"] if total["valid_ratings"] else 0
     
     # Instructor breakdown
-    instructor_stats = {}
+    instructor_ratings = {}
     for entry in processed_data:
-        instructor = entry["instructor"]
-        if instructor not in instructor_stats:
-            instructor_stats[instructor] = {
-                "total_responses": 0,
-                "positive": 0,
-                "negative": 0,
-                "neutral": 0,
-                "flagged": 0,
-                "ratings": [],
-                "avg_rating": 0
-            }
-        
-        stats = instructor_stats[instructor]
-        stats["total_responses"] += 1
-        stats[entry["sentiment_analysis"]["overall_sentiment"]] += 1
-        if entry["sentiment_analysis"]["is_flagged"]:
-            stats["flagged"] += 1
         if entry["rating"] > 0:
-            stats["ratings"].append(entry["rating"])
-    
-    # Calculate averages for instructors
-    for instructor, stats in instructor_stats.items():
-        if stats["ratings"]:
-            stats["avg_rating"] = sum(stats["ratings"]) / len(stats["ratings"])
+            instructor_ratings.setdefault(entry["instructor"], []).append(entry["rating"])
+    instructor_stats = {
+        instructor: {
+            "total_responses": stats["responses"],
+            "positive": stats["positive"],
+            "negative": stats["negative"],
+            "neutral": stats["neutral"],
+            "flagged": stats["flagged"],
+            "ratings": instructor_ratings.get(instructor, []),
+            "avg_rating": stats["rating_sum"] / stats["valid_ratings"] if stats["valid_ratings"] else 0
+        }
+        for instructor, stats in aggregates["instructors"].items()
+    }
     
     return {
         "total_responses": total_responses,
@@ -287,11 +285,11 @@ def main():
         print("="*50)
         
         # Output JSON for frontend consumption
-        print("\n" + json.dumps(result, indent=2, ensure_ascii=False))
+        print("\n" + dumps(result, indent=True).decode("utf-8"))
         
     else:
         print(f"\n❌ ERROR: {result['message']}")
-        print(json.dumps(result, indent=2))
+        print(dumps(result, indent=True).decode("utf-8"))
         sys.exit(1)
 
 if __name__ == "__main__":
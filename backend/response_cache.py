@@ -0,0 +1,147 @@
+import gzip
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from serialization import dumps
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Serialized Response Cache ----------------
+# Keeps the final JSON bytes (and compressed copies) for each checkpoint
+# version so cache hits skip re-validating and re-serializing the payload.
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "32"))
+GZIP_MIN_BYTES = 1024
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+def file_version(file_path: str):
+    """Cheap version tag for a checkpoint file (mtime + size), or None if missing"""
+    try:
+        stats = os.stat(file_path)
+    except OSError:
+        return None
+    return f"{stats.st_mtime_ns:x}-{stats.st_size:x}"
+
+def serialize_response(data) -> dict:
+    """Serialize a payload once and pre-compress it"""
+    body = dumps(data)
+    entry = {"body": body}
+    if len(body) >= GZIP_MIN_BYTES:
+        for encoding in SUPPORTED_ENCODINGS:
+            entry[encoding] = compress_body(body, encoding)
+    return entry
+
+def get_cached_response(key: str, version: str):
+    """Return the cached entry for key if it was built from this version"""
+    if version is None:
+        return None
+    with _lock:
+        cached = _cache.get(key)
+        if not cached or cached[0] != version:
+            return None
+        _cache.move_to_end(key)
+        return cached[1]
+
+def store_cached_response(key: str, version: str, data) -> dict:
+    """Serialize data and remember it for key at the given version"""
+    entry = serialize_response(data)
+    if version is not None:
+        with _lock:
+            _cache[key] = (version, entry)
+            _cache.move_to_end(key)
+            while len(_cache) > RESPONSE_CACHE_MAX_ENTRIES:
+                _cache.popitem(last=False)
+        logger.info(f"Cached serialized response for {key} ({len(entry['body'])} bytes)")
+    return entry
+
+def invalidate_cached_response(key: str = None):
+    """Drop the cached responses for key (and its "key:variant" entries), or all of them"""
+    with _lock:
+        if key is None:
+            _cache.clear()
+            return
+        for cached_key in [k for k in _cache if k == key or k.startswith(f"{key}:")]:
+            del _cache[cached_key]
+
+# ---------------- Content Negotiation ----------------
+def negotiate_encoding(accept_encoding: str):
+    """Best supported Content-Encoding for an Accept-Encoding header (None = identity)"""
+    weights = {}
+    for part in (accept_encoding or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """Compress a response body with gzip or brotli"""
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+def response_payload(entry: dict, accept_encoding: str = ""):
+    """Pick the body and content headers to send for a cached entry"""
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding and entry.get(encoding) is not None:
+        headers["Content-Encoding"] = encoding
+        return entry[encoding], headers
+    return entry["body"], headers
+
+# ---------------- Validators ----------------
+# Strong ETags are derived from the checkpoint version plus the request
+# variant (query string), so they can be checked with a stat() alone. Each
+# content-coding gets its own tag ("<tag>-gzip"), as strong validators must
+# differ between representations.
+def make_etag(key: str, version: str, variant: str = "") -> str:
+    """Quoted strong ETag for one variant of a checkpoint version"""
+    digest = hashlib.sha1(f"{key}|{version}|{variant}".encode("utf-8")).hexdigest()[:20]
+    return f'"{digest}"'
+
+def encoded_etag(etag: str, encoding: str = None) -> str:
+    """ETag of the representation sent with the given Content-Encoding"""
+    if not etag or not encoding:
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match check (weak comparison, any content-coding of the same variant)"""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        for encoding in SUPPORTED_ENCODINGS:
+            if candidate.endswith(f'-{encoding}"'):
+                candidate = f'{candidate[:-len(encoding) - 2]}"'
+                break
+        if candidate == etag:
+            return True
+    return False
@@ -0,0 +1,219 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import hyperloglog
+from aggregation import instructor_name, student_key, student_keys
+from feedback_index import TIMESTAMP_FORMATS, parse_datetime, normalize_value
+
+# ---------------- Rollups ----------------
+# Per-sheet time series cubes keyed by (period, instructor), persisted with the
+# checkpoint under "rollups" so trend charts never have to read raw rows:
+#   {"version": 2, "rows": 5644, "undated": 0,
+#    "day":  {"2025-08-05": {"Supriya": cell, ...}, ...},
+#    "week": {"2025-W32":   {"Supriya": cell, ...}, ...}}
+# A cell holds the response count, the sum and count of valid (> 0) ratings,
+# sentiment counts, the flagged count and a HyperLogLog sketch of the
+# respondents ("students"), which merges across days and instructors. Rows
+# without a parseable timestamp are only counted in "undated". Refreshes apply
+# added rows to the cells like the running aggregates; since sketches cannot
+# forget a student, removals rebuild the cubes. Full builds use one grouped pass.
+ROLLUPS_VERSION = 2
+CELL_FIELDS = ("responses", "rating_sum", "valid_ratings", "positive", "negative", "neutral", "flagged")
+SENTIMENTS = ("positive", "negative", "neutral")
+GRANULARITIES = ("day", "week", "month")
+
+def day_key(moment) -> str:
+    return moment.strftime("%Y-%m-%d")
+
+def week_key(moment) -> str:
+    year, week, _ = moment.isocalendar()
+    return f"{year}-W{week:02d}"
+
+def month_key(moment) -> str:
+    return moment.strftime("%Y-%m")
+
+def period_start(granularity: str, key: str) -> str:
+    """First day (YYYY-MM-DD) of a period key"""
+    if granularity == "week":
+        year, week = key.split("-W")
+        return date.fromisocalendar(int(year), int(week), 1).isoformat()
+    if granularity == "month":
+        return f"{key}-01"
+    return key
+
+def _empty_cell() -> dict:
+    return dict({name: 0.0 if name == "rating_sum" else 0 for name in CELL_FIELDS}, students="")
+
+def _cell(values: dict, students: str = "") -> dict:
+    return dict({name: float(values[name]) if name == "rating_sum" else int(values[name]) for name in CELL_FIELDS},
+                students=students)
+
+def _apply(cell: dict, row: dict, sign: int):
+    cell["responses"] += sign
+    cell[row["sentiment"]] += sign
+    cell["flagged"] += sign if row.get("is_flagged") else 0
+    if row["rating"] > 0:
+        cell["rating_sum"] += sign * row["rating"]
+        cell["valid_ratings"] += sign
+
+def empty_rollups() -> dict:
+    return {"version": ROLLUPS_VERSION, "rows": 0, "undated": 0, "day": {}, "week": {}}
+
+def rollups_match(rollups, rows: list) -> bool:
+    """Whether stored rollups are in the current format and cover exactly these rows"""
+    return isinstance(rollups, dict) and rollups.get("version") == ROLLUPS_VERSION and rollups.get("rows") == len(rows)
+
+def copy_rollups(rollups: dict) -> dict:
+    copied = dict(rollups)
+    for granularity in ("day", "week"):
+        copied[granularity] = {
+            key: {name: dict(cell) for name, cell in cells.items()} for key, cells in rollups[granularity].items()
+        }
+    return copied
+
+def apply_rollup_rows(rollups: dict, added: list = (), removed: list = (), rows: list = None) -> dict:
+    """Apply row deltas to rollup cells in place
+
+    ``rows`` are all rows after the change; when rows were removed the cubes are
+    rebuilt from them so the student sketches drop removed students.
+    """
+    if removed and rows is not None:
+        return build_rollups(rows)
+    students = {}
+    for delta, sign in ((removed, -1), (added, 1)):
+        for row in delta:
+            rollups["rows"] += sign
+            moment = parse_datetime(row.get("timestamp"))
+            if moment is None:
+                rollups["undated"] += sign
+                continue
+            instructor = str(instructor_name(row.get("instructor", "")))
+            student = student_key(row) if sign > 0 else None
+            for granularity, key in (("day", day_key(moment)), ("week", week_key(moment))):
+                cells = rollups[granularity].setdefault(key, {})
+                cell = cells.setdefault(instructor, _empty_cell())
+                _apply(cell, row, sign)
+                if student is not None:
+                    students.setdefault((granularity, key, instructor), []).append(student)
+                if cell["responses"] <= 0:
+                    del cells[instructor]
+                    if not cells:
+                        del rollups[granularity][key]
+    # One decode/encode per touched cell
+    for (granularity, key, instructor), names in students.items():
+        cell = rollups[granularity][key][instructor]
+        cell["students"] = hyperloglog.add(cell["students"], hyperloglog.hash_keys(names))
+    return rollups
+
+def parse_timestamp_column(values) -> pd.Series:
+    """Vectorized parse_datetime: each of TIMESTAMP_FORMATS in turn, NaT where none match"""
+    text = pd.Series(values, dtype=object).map(lambda v: "" if v is None else str(v).strip())
+    moments = pd.Series(pd.NaT, index=text.index, dtype="datetime64[us]")
+    for fmt in TIMESTAMP_FORMATS:
+        missing = moments.isna()
+        if not missing.any():
+            break
+        moments[missing] = pd.to_datetime(text[missing], format=fmt, errors="coerce")
+    return moments
+
+def build_rollups(rows: list) -> dict:
+    """Rollup cubes for rows from scratch, one groupby per granularity"""
+    rollups = empty_rollups()
+    rollups["rows"] = len(rows)
+    if not rows:
+        return rollups
+
+    moments = parse_timestamp_column([row.get("timestamp") for row in rows])
+    dated = moments.notna().to_numpy()
+    rollups["undated"] = int((~dated).sum())
+    if not dated.any():
+        return rollups
+
+    ratings = pd.to_numeric(pd.Series([row["rating"] for row in rows]), errors="coerce").fillna(0).to_numpy(dtype="float64")
+    sentiments = np.asarray([row["sentiment"] for row in rows], dtype=object)
+    students = student_keys(rows)
+    frame = pd.DataFrame({
+        "instructor": [str(instructor_name(row.get("instructor", ""))) for row in rows],
+        "responses": 1,
+        "rating_sum": np.where(ratings > 0, ratings, 0.0),
+        "valid_ratings": (ratings > 0).astype("int64"),
+        "flagged": np.asarray([bool(row.get("is_flagged")) for row in rows], dtype="int64"),
+        **{sentiment: (sentiments == sentiment).astype("int64") for sentiment in SENTIMENTS},
+    })[dated]
+    moments = moments[dated]
+    students = students[dated]
+    known = pd.notna(students)
+    key_codes, uniques = pd.factorize(students[known], sort=False)
+    hashes = hyperloglog.hash_keys(uniques)[key_codes]
+
+    # Group on the period's first day and format keys once per group
+    days = moments.dt.normalize()
+    periods = {"day": (days, day_key), "week": (days - pd.to_timedelta(days.dt.dayofweek, unit="D"), week_key)}
+    for granularity, (starts, to_key) in periods.items():
+        grouped = frame.groupby([starts.to_numpy(), frame["instructor"].to_numpy()], sort=True)
+        sums = grouped[list(CELL_FIELDS)].sum()
+        # ngroup numbers groups in the same sorted order as the sums
+        codes = grouped.ngroup().to_numpy()
+        registers = hyperloglog.grouped_registers(codes[known], len(sums), hashes)
+        cube = rollups[granularity]
+        for position, ((start, instructor), values) in enumerate(sums.to_dict("index").items()):
+            cube.setdefault(to_key(start), {})[instructor] = _cell(values, hyperloglog.encode(registers[position]))
+    return rollups
+
+# ---------------- Trend Queries ----------------
+def _summed(cells: list) -> dict:
+    total = _empty_cell()
+    for cell in cells:
+        for name in CELL_FIELDS:
+            total[name] += cell[name]
+    total["students"] = hyperloglog.merge(cell.get("students", "") for cell in cells)
+    return total
+
+def _point(cell: dict) -> dict:
+    return {
+        "responses": cell["responses"],
+        "average_rating": round(cell["rating_sum"] / cell["valid_ratings"], 2) if cell["valid_ratings"] else 0,
+        "valid_ratings": cell["valid_ratings"],
+        "positive_count": cell["positive"],
+        "negative_count": cell["negative"],
+        "neutral_count": cell["neutral"],
+        "flagged_count": cell["flagged"],
+        "unique_students": min(hyperloglog.estimate(cell["students"]), cell["responses"]),
+    }
+
+def trend_series(rollups: dict, granularity: str = "day", start_date: str = None, end_date: str = None,
+                 instructor: str = None, by_instructor: bool = False) -> list:
+    """Points per period with data (oldest first) summed from rollup cells; dates are inclusive YYYY-MM-DD
+
+    Weeks come straight from the week cube unless the date range cuts through a
+    week, in which case they are summed from the day cells inside the range.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    aligned = ((start_date is None or date.fromisoformat(start_date).weekday() == 0)
+               and (end_date is None or date.fromisoformat(end_date).weekday() == 6))
+    if granularity == "week" and aligned:
+        sources = [(key, period_start("week", key), cells) for key, cells in rollups["week"].items()]
+    else:
+        to_key = {"day": day_key, "week": week_key, "month": month_key}[granularity]
+        sources = [(to_key(date.fromisoformat(key)), key, cells) for key, cells in rollups["day"].items()]
+    wanted = normalize_value(instructor) if instructor else None
+
+    periods = {}
+    for key, first_day, cells in sources:
+        if (start_date and first_day < start_date) or (end_date and first_day > end_date):
+            continue
+        for name, cell in cells.items():
+            if wanted is None or normalize_value(name) == wanted:
+                periods.setdefault(key, {}).setdefault(name, []).append(cell)
+
+    series = []
+    for key in sorted(periods):
+        by_name = {name: _summed(cells) for name, cells in periods[key].items()}
+        point = dict(period=key, start=period_start(granularity, key), **_point(_summed(by_name.values())))
+        if by_instructor:
+            point["instructors"] = {name: _point(cell) for name, cell in sorted(by_name.items())}
+        series.append(point)
+    return series
@@ -0,0 +1,77 @@
+# ---------------- Row Encoding ----------------
+# Field projection and the compact "columnar" encoding for processed rows.
+# Columnar payloads send one array per field, dictionary-encode repetitive
+# strings (instructor, sentiment, college) and round floats:
+#   {"encoding": "columnar", "length": 2, "fields": ["instructor", "rating"],
+#    "columns": {"instructor": [0, 1], "rating": [4.0, 5.0]},
+#    "dictionaries": {"instructor": ["Supriya", "Vijay Kumar"]}}
+ROW_FIELDS = (
+    "row_id", "timestamp", "email", "student_name", "session_feedback", "instructor", "rating",
+    "additional_comments", "sentiment", "confidence", "sentiment_score", "is_flagged", "college",
+)
+FLOAT_FIELDS = ("rating", "confidence", "sentiment_score")
+DICTIONARY_FIELDS = ("instructor", "sentiment", "college")
+ENCODINGS = ("rows", "columnar")
+DEFAULT_COLUMNAR_PRECISION = 3
+
+def parse_fields(fields: str):
+    """Comma-separated field list -> validated list (None means all fields)"""
+    if not fields or not fields.strip():
+        return None
+    selected = []
+    for name in fields.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in ROW_FIELDS:
+            raise ValueError(f"Unknown field '{name}', expected any of {', '.join(ROW_FIELDS)}")
+        if name not in selected:
+            selected.append(name)
+    return selected or None
+
+def _round(value, precision: int):
+    if precision is None or not isinstance(value, float):
+        return value
+    return round(value, precision)
+
+def project_rows(rows: list, fields: list = None, precision: int = None) -> list:
+    """Rows restricted to fields, with floats rounded when precision is set"""
+    if fields is None and precision is None:
+        return rows
+    projected = []
+    for row in rows:
+        names = fields if fields is not None else row.keys()
+        projected.append({
+            name: _round(row.get(name), precision) if name in FLOAT_FIELDS else row.get(name)
+            for name in names
+        })
+    return projected
+
+def encode_columnar(rows: list, fields: list = None, precision: int = DEFAULT_COLUMNAR_PRECISION) -> dict:
+    """One array per field, with dictionary-encoded strings and rounded floats"""
+    if fields is None:
+        fields = [name for name in ROW_FIELDS if rows and name in rows[0]]
+    columns, dictionaries = {}, {}
+    for name in fields:
+        values = [row.get(name) for row in rows]
+        if name in DICTIONARY_FIELDS:
+            codes = {}
+            columns[name] = [codes.setdefault(value, len(codes)) for value in values]
+            dictionaries[name] = list(codes)
+        elif name in FLOAT_FIELDS:
+            columns[name] = [_round(value, precision) for value in values]
+        else:
+            columns[name] = values
+    return {
+        "encoding": "columnar",
+        "length": len(rows),
+        "fields": list(fields),
+        "columns": columns,
+        "dictionaries": dictionaries,
+    }
+
+def encode_rows(rows: list, fields: list = None, encoding: str = "rows", precision: int = None):
+    """Encode rows for a response in the requested encoding"""
+    if encoding == "columnar":
+        return encode_columnar(rows, fields, DEFAULT_COLUMNAR_PRECISION if precision is None else precision)
+    return project_rows(rows, fields, precision)
@@ -0,0 +1,225 @@
+import base64
+import re
+import threading
+import zlib
+
+import numpy as np
+
+from feedback_index import FILTER_FIELDS, normalize_value, rows_appended
+
+# ---------------- Search Index ----------------
+# Per-sheet inverted index over the feedback text, persisted with the
+# checkpoint under "search_index":
+#   {"version": 1, "rows": 5644, "postings": {"audio": [chunk, ...], "too fast": [chunk], ...}}
+# Terms are lowercase word tokens of SEARCH_FIELDS plus bigrams of adjacent
+# tokens within a field ("too fast"). A posting chunk is ascending row ids
+# stored as uint32 deltas (the first one absolute), zlib-compressed and base64
+# encoded. A refresh that only appends rows adds one chunk to each term its new
+# rows contain instead of recompressing busy terms; terms with more than
+# MAX_CHUNKS chunks are folded back into one. Other refreshes rebuild.
+SEARCH_INDEX_VERSION = 1
+SEARCH_FIELDS = ("session_feedback", "additional_comments")
+MAX_CHUNKS = 8
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z0-9]+)*")
+
+def tokenize(text) -> list:
+    return TOKEN_PATTERN.findall(str(text if text is not None else "").lower())
+
+def row_terms(row: dict) -> set:
+    """Tokens and in-field bigrams of a row's searchable text"""
+    terms = set()
+    for field in SEARCH_FIELDS:
+        tokens = tokenize(row.get(field))
+        terms.update(tokens)
+        terms.update(f"{first} {second}" for first, second in zip(tokens, tokens[1:]))
+    return terms
+
+def encode_chunk(row_ids) -> str:
+    ids = np.asarray(row_ids, dtype=np.int64)
+    deltas = np.diff(ids, prepend=0).astype(np.uint32)
+    return base64.b64encode(zlib.compress(deltas.tobytes())).decode("ascii")
+
+def decode_chunk(chunk: str) -> np.ndarray:
+    return np.cumsum(np.frombuffer(zlib.decompress(base64.b64decode(chunk)), dtype=np.uint32), dtype=np.int64)
+
+def decode_postings(chunks: list) -> np.ndarray:
+    """Ascending row ids of a term"""
+    if len(chunks) == 1:
+        return decode_chunk(chunks[0])
+    return np.concatenate([decode_chunk(chunk) for chunk in chunks])
+
+def empty_search_index() -> dict:
+    return {"version": SEARCH_INDEX_VERSION, "rows": 0, "postings": {}}
+
+def search_index_matches(index, rows: list) -> bool:
+    """Whether a stored search index is in the current format and covers exactly these rows"""
+    return isinstance(index, dict) and index.get("version") == SEARCH_INDEX_VERSION and index.get("rows") == len(rows)
+
+def _term_ids(rows: list, start: int) -> dict:
+    ids = {}
+    for row_id, row in enumerate(rows[start:], start):
+        for term in row_terms(row):
+            ids.setdefault(term, []).append(row_id)
+    return ids
+
+def extend_search_index(index: dict, rows: list, start: int) -> dict:
+    """Index with rows[start:] appended as new chunks; index itself is left untouched"""
+    postings = dict(index["postings"])
+    for term, ids in _term_ids(rows, start).items():
+        chunks = postings.get(term, []) + [encode_chunk(ids)]
+        if len(chunks) > MAX_CHUNKS:
+            chunks = [encode_chunk(decode_postings(chunks))]
+        postings[term] = chunks
+    return {"version": SEARCH_INDEX_VERSION, "rows": len(rows), "postings": postings}
+
+def build_search_index(rows: list) -> dict:
+    """Search index for rows from scratch, one chunk per term"""
+    postings = {term: [encode_chunk(ids)] for term, ids in _term_ids(rows, 0).items()}
+    return {"version": SEARCH_INDEX_VERSION, "rows": len(rows), "postings": postings}
+
+def update_search_index(index, old_rows: list, new_rows: list, added: list, removed: list) -> dict:
+    """Search index for new_rows, appending to index when the refresh only appended rows"""
+    if rows_appended(old_rows, new_rows, added, removed) and search_index_matches(index, old_rows):
+        return extend_search_index(index, new_rows, len(old_rows))
+    return build_search_index(new_rows)
+
+# ---------------- Queries ----------------
+# Query syntax: whitespace-separated words and "quoted phrases" must all match
+# (AND is optional); OR separates alternatives and binds loosest; NOT or a
+# leading "-" excludes a word or phrase:
+#   audio OR "too fast"      lab -timing      "not clear" NOT audio
+# Matching works on boolean masks over row ids, so a query costs a few
+# vectorized passes over the rows plus the length of the postings it reads.
+QUERY_PATTERN = re.compile(r'(-?)"([^"]*)"|(\S+)')
+
+def parse_query(query: str) -> list:
+    """OR-separated clauses, each a list of (negated, tokens) parts"""
+    clauses, parts, negate = [], [], False
+    for minus, phrase, word in QUERY_PATTERN.findall(query or ""):
+        if word in ("OR", "|"):
+            clauses.append(parts)
+            parts, negate = [], False
+            continue
+        if word == "AND":
+            continue
+        if word == "NOT":
+            negate = True
+            continue
+        negated = negate or bool(minus)
+        if word.startswith("-") and len(word) > 1:
+            negated, word = True, word[1:]
+        tokens = tokenize(phrase if not word else word)
+        if tokens:
+            parts.append((negated, tokens))
+        negate = False
+    clauses.append(parts)
+    clauses = [parts for parts in clauses if parts]
+    if not clauses:
+        raise ValueError("Query has no searchable terms")
+    return clauses
+
+class TextSearch:
+    """Boolean and phrase queries over one version of a sheet's rows and search index"""
+
+    def __init__(self, index, search_index: dict):
+        self.index = index
+        self.postings = search_index["postings"]
+        self._ids = {}
+        self._masks = {}
+        self._timestamps = None
+        self._lock = threading.Lock()
+
+    def term_ids(self, term: str) -> np.ndarray:
+        """Decoded postings of a term, cached"""
+        ids = self._ids.get(term)
+        if ids is None:
+            chunks = self.postings.get(term)
+            ids = decode_postings(chunks) if chunks else np.empty(0, dtype=np.int64)
+            with self._lock:
+                self._ids[term] = ids
+        return ids
+
+    def _mask(self, ids) -> np.ndarray:
+        mask = np.zeros(len(self.index.rows), dtype=bool)
+        mask[ids] = True
+        return mask
+
+    def phrase_mask(self, tokens: list) -> np.ndarray:
+        """Rows containing the tokens in order within one field"""
+        if len(tokens) == 1:
+            return self._mask(self.term_ids(tokens[0]))
+        mask = self._mask(self.term_ids(f"{tokens[0]} {tokens[1]}"))
+        for first, second in zip(tokens[1:], tokens[2:]):
+            mask &= self._mask(self.term_ids(f"{first} {second}"))
+        if len(tokens) > 2:
+            # Every bigram matched; check the whole phrase on the remaining candidates
+            width = len(tokens)
+            for row_id in np.flatnonzero(mask):
+                row = self.index.rows[row_id]
+                mask[row_id] = any(
+                    field_tokens[start:start + width] == tokens
+                    for field_tokens in (tokenize(row.get(field)) for field in SEARCH_FIELDS)
+                    for start in range(len(field_tokens) - width + 1)
+                )
+        return mask
+
+    def query_mask(self, clauses: list) -> np.ndarray:
+        matched = np.zeros(len(self.index.rows), dtype=bool)
+        for parts in clauses:
+            clause = np.ones(len(self.index.rows), dtype=bool)
+            for negated, tokens in parts:
+                if negated:
+                    clause &= ~self.phrase_mask(tokens)
+                else:
+                    clause &= self.phrase_mask(tokens)
+            matched |= clause
+        return matched
+
+    def filter_mask(self, filters: dict):
+        """Rows matching the instructor / sentiment / college and date filters (None when none are set)"""
+        mask = None
+        for field in FILTER_FIELDS:
+            if filters.get(field):
+                key = (field, normalize_value(filters[field]))
+                field_mask = self._masks.get(key)
+                if field_mask is None:
+                    field_mask = self._mask(self.index.postings(field).get(key[1], []))
+                    with self._lock:
+                        self._masks[key] = field_mask
+                mask = field_mask.copy() if mask is None else mask & field_mask
+        if filters.get("start") is not None or filters.get("end") is not None:
+            timestamps = self.timestamps()
+            dated = timestamps > float("-inf")
+            if filters.get("start") is not None:
+                dated &= timestamps >= filters["start"]
+            if filters.get("end") is not None:
+                dated &= timestamps < filters["end"]
+            mask = dated if mask is None else mask & dated
+        return mask
+
+    def timestamps(self) -> np.ndarray:
+        if self._timestamps is None:
+            self._timestamps = np.asarray(self.index.row_keys("timestamp"), dtype="float64")
+        return self._timestamps
+
+    def search(self, query: str, filters: dict = None, limit: int = 50, offset: int = 0) -> dict:
+        """Rows matching query and filters, newest first"""
+        mask = self.query_mask(parse_query(query))
+        allowed = self.filter_mask(filters or {})
+        if allowed is not None:
+            mask &= allowed
+        row_ids = np.flatnonzero(mask)
+        end = min(offset + limit, len(row_ids))
+        selected = np.empty(0, dtype=np.int64)
+        if offset < end:
+            # Only rows up to this page's last key are ordered (by time, then row id, so ties page stably)
+            order = -self.timestamps()[row_ids]
+            top = np.flatnonzero(order <= np.partition(order, end - 1)[end - 1])
+            top = top[np.lexsort((row_ids[top], order[top]))]
+            selected = row_ids[top[offset:end]]
+        return {
+            "rows": [dict(self.index.rows[row_id], row_id=int(row_id)) for row_id in selected],
+            "total_matches": int(len(row_ids)),
+            "offset": offset,
+            "limit": limit,
+        }
@@ -0,0 +1,67 @@
+import json
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # fall back to the standard library encoder
+    orjson = None
+
+# ---------------- JSON Serialization ----------------
+# One encoder for HTTP responses, checkpoint files and CLI output. orjson
+# handles NumPy arrays/scalars natively; _default covers the remaining pandas
+# and NumPy values that come out of a DataFrame row.
+if orjson:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+def _default(obj):
+    if hasattr(obj, "tolist"):  # NumPy scalars and arrays
+        return obj.tolist()
+    if hasattr(obj, "isoformat"):  # datetime, pandas Timestamp (NaT != NaT)
+        return None if obj != obj else obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(obj, indent: bool = False) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes"""
+    if orjson:
+        options = _ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=_default, option=options)
+    return json.dumps(obj, default=_default, ensure_ascii=False,
+                      indent=2 if indent else None,
+                      separators=None if indent else (",", ":")).encode("utf-8")
+
+def loads(data):
+    """Parse JSON from bytes or str"""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dump_file(file_path: str, obj):
+    """Write obj as compact JSON to file_path"""
+    with open(file_path, "wb") as f:
+        f.write(dumps(obj))
+
+def load_file(file_path: str):
+    """Read a JSON file written by dump_file (or any JSON file)"""
+    with open(file_path, "rb") as f:
+        return loads(f.read())
+
+def install_flask_json(app):
+    """Route Flask's jsonify and request.get_json through this module"""
+    from flask.json.provider import DefaultJSONProvider
+
+    class FastJSONProvider(DefaultJSONProvider):
+        def dumps(self, obj, **kwargs):
+            return dumps(obj).decode("utf-8")
+
+        def loads(self, s, **kwargs):
+            return loads(s)
+
+        def response(self, *args, **kwargs):
+            obj = args[0] if len(args) == 1 else (list(args) if args else kwargs)
+            return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+    app.json = FastJSONProvider(app)
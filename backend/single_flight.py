@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, in-process coalescing still applies
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Single Flight ----------------
+# Concurrent requests for the same sheet (or CSV content hash) share one
+# fetch-and-score run instead of each doing the work and racing to write the
+# same checkpoint. Threads in one process wait for the leader's result; other
+# worker processes queue on a FileLock next to the checkpoint and re-check the
+# checkpoint once they hold it. The leader can hand that lock to the
+# checkpoint writer, which releases it once the new checkpoint is on disk.
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+_calls = {}
+_lock = threading.Lock()
+_inflight = {}
+
+class FileLock:
+    """Exclusive advisory lock on lock_path that can be released from another thread"""
+    def __init__(self, lock_path: str):
+        self.lock_path = lock_path
+        self._file = None
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.lock_path, "a")
+        return self._file
+
+    def acquire(self):
+        if fcntl is not None:
+            fcntl.flock(self._open(), fcntl.LOCK_EX)
+        return self
+
+    def try_acquire(self) -> bool:
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self._open(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    async def acquire_async(self, poll: float = 0.05):
+        """Wait for the lock without tying up a thread"""
+        while not self.try_acquire():
+            await asyncio.sleep(poll)
+        return self
+
+    def release(self):
+        """Release the lock; safe to call more than once"""
+        f, self._file = self._file, None
+        if f is not None:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+            finally:
+                f.close()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+def single_flight(key: str, fn):
+    """Run fn() once per key at a time; concurrent callers get the same result or error"""
+    with _lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+        else:
+            call.waiters += 1
+
+    if not leader:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = fn()
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _lock:
+            del _calls[key]
+        call.done.set()
+        if call.waiters:
+            logger.info(f"Shared result of {key} with {call.waiters} concurrent callers")
+
+async def single_flight_async(key: str, fn, *args):
+    """Await fn(*args) once per key; concurrent awaiters share the same result"""
+    future = _inflight.get(key)
+    if future is None:
+        future = _inflight[key] = asyncio.ensure_future(fn(*args))
+        future.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(future)
@@ -0,0 +1,46 @@
+import csv
+import io
+
+from row_encoding import ROW_FIELDS
+from serialization import dumps
+
+# ---------------- Streaming Exports ----------------
+# Generators that encode rows one at a time (NDJSON) or in small chunks (CSV)
+# so full exports never build the whole payload in memory.
+EXPORT_FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+CSV_CHUNK_BYTES = 64 * 1024
+# Same columns as the JSON and NDJSON rows; row_id only appears on paged and search results
+DEFAULT_CSV_FIELDS = tuple(name for name in ROW_FIELDS if name != "row_id")
+
+def _project(row: dict, fields):
+    return row if fields is None else {name: row.get(name) for name in fields}
+
+def iter_ndjson(rows, fields: list = None):
+    """One JSON document per line"""
+    for row in rows:
+        yield dumps(_project(row, fields)) + b"\n"
+
+def iter_csv(rows, fields: list = None):
+    """CSV with a header row, flushed in ~64 KB chunks"""
+    fields = list(fields or DEFAULT_CSV_FIELDS)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for row in rows:
+        writer.writerow(["" if row.get(name) is None else row.get(name) for name in fields])
+        if buffer.tell() >= CSV_CHUNK_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def iter_export(rows, export_format: str, fields: list = None):
+    """Encoded chunks for rows in the requested export format"""
+    if export_format == "csv":
+        return iter_csv(rows, fields)
+    return iter_ndjson(rows, fields)
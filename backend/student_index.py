@@ -0,0 +1,78 @@
+from aggregation import student_key, student_keys
+from feedback_index import (
+    flagged_entry, parse_datetime, empty_postings_index, postings_index_matches, extend_postings_index,
+    update_postings_index,
+)
+from rollups import day_key
+
+# ---------------- Student Index ----------------
+# Per-sheet postings (see feedback_index "Persisted Postings") from a student
+# (normalized email, else student name, as in aggregation.student_key) to row
+# ids in all_data, persisted with the checkpoint under "student_index":
+#   {"version": 2, "rows": 5644,
+#    "postings": {"ravi@college.edu": [12, 840, ...], ...},
+#    "flagged":  {"ravi@college.edu": [840], ...}}
+# Repeated complainers come from "flagged" without touching the rows.
+def student_index_matches(index, rows: list) -> bool:
+    return postings_index_matches(index, rows)
+
+def build_student_index(rows: list) -> dict:
+    """Student index for rows from scratch"""
+    return extend_postings_index(empty_postings_index(), rows, student_keys(rows))
+
+def update_student_index(index, old_rows: list, new_rows: list, added: list, removed: list) -> dict:
+    """Student index for new_rows, appending to index when the refresh only appended rows"""
+    return update_postings_index(index, old_rows, new_rows, added, removed, student_keys)
+
+# ---------------- Student Queries ----------------
+def sentiment_trend(rows: list) -> list:
+    """Per-day points (oldest first) of a student's responses, average rating and sentiment score"""
+    days = {}
+    for row in rows:
+        moment = parse_datetime(row.get("timestamp"))
+        if moment is not None:
+            days.setdefault(day_key(moment), []).append(row)
+    trend = []
+    for day in sorted(days):
+        day_rows = days[day]
+        ratings = [row["rating"] for row in day_rows if row["rating"] > 0]
+        trend.append({
+            "date": day,
+            "responses": len(day_rows),
+            "average_rating": round(sum(ratings) / len(ratings), 2) if ratings else 0,
+            "average_sentiment": round(sum(row.get("sentiment_score", 0.0) for row in day_rows) / len(day_rows), 3),
+            "negative_count": sum(1 for row in day_rows if row["sentiment"] == "negative"),
+            "flagged_count": sum(1 for row in day_rows if row.get("is_flagged")),
+        })
+    return trend
+
+def student_history(index: dict, rows: list, student: str):
+    """A student's rows (in sheet order, with row ids) and sentiment trend, or None if the index has no such student"""
+    key = student_key({"email": student})
+    row_ids = index["postings"].get(key) if key else None
+    if not row_ids:
+        return None
+    selected = [rows[row_id] for row_id in row_ids]
+    return {
+        "student": key,
+        "total_responses": len(row_ids),
+        "flagged_count": len(index["flagged"].get(key, ())),
+        "instructors": sorted({str(row.get("instructor", "")) for row in selected}),
+        "rows": [dict(row, row_id=row_id) for row_id, row in zip(row_ids, selected)],
+        "sentiment_trend": sentiment_trend(selected),
+    }
+
+def repeated_complainers(index: dict, rows: list, min_flagged: int = 2, limit: int = 50) -> dict:
+    """Students with at least min_flagged flagged rows, most flagged first"""
+    matches = sorted(((len(ids), key) for key, ids in index["flagged"].items() if len(ids) >= min_flagged),
+                     key=lambda match: (-match[0], match[1]))
+    return {
+        "students": [{
+            "student": key,
+            "flagged_count": count,
+            "total_responses": len(index["postings"][key]),
+            "last_flagged": flagged_entry(rows[index["flagged"][key][-1]]),
+        } for count, key in matches[:limit]],
+        "total_students": len(matches),
+        "min_flagged": min_flagged,
+    }
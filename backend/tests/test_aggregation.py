@@ -0,0 +1,44 @@
+import random
+
+from aggregation import (
+    apply_rows, build_aggregates, empty_aggregates, instructor_stats_from_aggregates, summary_from_aggregates,
+)
+
+SENTIMENTS = ("positive", "neutral", "negative")
+INSTRUCTORS = ("Supriya", "Vijay Kumar", "Eda Shashi Kiran Reddy", "Deepthi")
+
+def make_rows(count: int, seed: int = 7) -> list:
+    """Synthetic processed rows shaped like process_dataframe() output"""
+    rng = random.Random(seed)
+    rows = []
+    for position in range(count):
+        rating = float(rng.randint(0, 5))
+        score = round(rng.uniform(-1, 1), 4)
+        sentiment = rng.choice(SENTIMENTS)
+        rows.append({
+            "timestamp": f"8/{1 + position % 28}/2025 10:{position % 60:02d}:00",
+            "email": f"student{rng.randint(0, 150)}@example.edu",
+            "student_name": f"Student {position % 150}",
+            "instructor": rng.choice(INSTRUCTORS),
+            "rating": rating,
+            "sentiment": sentiment,
+            "sentiment_score": score,
+            "is_flagged": sentiment == "negative" or rating < 3,
+        })
+    return rows
+
+def loop_and_groupby(rows: list):
+    return apply_rows(empty_aggregates(), added=rows), build_aggregates(rows)
+
+def test_groupby_matches_per_row_loop():
+    loop, grouped = loop_and_groupby(make_rows(2000))
+    assert summary_from_aggregates(loop) == summary_from_aggregates(grouped)
+    assert instructor_stats_from_aggregates(loop) == instructor_stats_from_aggregates(grouped)
+
+def test_blank_instructors_group_together_on_both_paths():
+    # Blank instructor cells arrive as None from the sheets API and NaN from pandas CSV reads
+    rows = [dict(row, instructor=None if position % 2 else float("nan")) if position % 5 == 0 else row
+            for position, row in enumerate(make_rows(500))]
+    loop, grouped = loop_and_groupby(rows)
+    assert instructor_stats_from_aggregates(loop) == instructor_stats_from_aggregates(grouped)
+    assert "" in {entry["instructor"] for entry in instructor_stats_from_aggregates(grouped)}
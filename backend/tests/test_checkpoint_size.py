@@ -0,0 +1,39 @@
+import random
+
+from feedback_index import build_flagged_entries, compat_result, normalized_result
+from serialization import dumps
+
+def make_rows(count: int, seed: int = 11) -> list:
+    """Synthetic processed rows with the fields flagged_entries copies"""
+    rng = random.Random(seed)
+    rows = []
+    for position in range(count):
+        rating = float(rng.randint(1, 5))
+        sentiment = rng.choice(("positive", "neutral", "negative"))
+        rows.append({
+            "timestamp": f"8/{1 + position % 28}/2025 14:{position % 60:02d}:00",
+            "email": f"student{position % 200}@example.edu",
+            "student_name": f"Student {position % 200}",
+            "session_feedback": rng.choice(("Good session", "Too fast, could not follow", "Okay", "")),
+            "instructor": rng.choice(("Supriya", "Vijay Kumar", "Deepthi")),
+            "rating": rating,
+            "additional_comments": "",
+            "sentiment": sentiment,
+            "confidence": round(rng.random(), 4),
+            "sentiment_score": round(rng.uniform(-1, 1), 4),
+            "is_flagged": sentiment == "negative" or rating < 3,
+        })
+    return rows
+
+def legacy_checkpoint(rows: list) -> dict:
+    """A checkpoint as stored before flagged_row_ids: every flagged row copied into flagged_entries"""
+    return {"summary": {"total_responses": len(rows)}, "flagged_entries": build_flagged_entries(rows),
+            "all_data": rows, "processing_info": {"sheet_id": "test"}}
+
+def test_flagged_row_ids_checkpoint_is_smaller():
+    legacy = legacy_checkpoint(make_rows(1000))
+    assert len(dumps(normalized_result(legacy))) < len(dumps(legacy)) * 0.9
+
+def test_compat_result_restores_flagged_entries():
+    legacy = legacy_checkpoint(make_rows(1000))
+    assert compat_result(normalized_result(legacy))["flagged_entries"] == legacy["flagged_entries"]
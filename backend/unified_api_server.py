@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 import requests
 import pandas as pd
@@ -8,12 +8,26 @@ from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import re
 from datetime import datetime
 import logging
-import json
 import os
 import hashlib
+from feedback_index import (
+    FeedbackIndex, get_index, summary_view, public_result, parse_filters, filtered_result, row_matches,
+    flagged_order_ids, merge_flagged_ids, normalized_result, compat_result,
+)
+from aggregation import (
+    build_aggregates, aggregates_match, apply_rows, copy_aggregates, summary_from_aggregates, instructor_stats_from_aggregates,
+)
+from response_cache import negotiate_encoding, compress_body, make_etag, encoded_etag, etag_matches, GZIP_MIN_BYTES
+from row_encoding import ENCODINGS, parse_fields, encode_rows
+from serialization import install_flask_json
+from checkpoint_store import read_checkpoint, checkpoint_lock, CheckpointCorrupt
+from checkpoint_writer import schedule_write, pending_checkpoint, checkpoint_version, discard_pending, writer_stats
+from streaming import EXPORT_FORMATS, MEDIA_TYPES, iter_export
+from single_flight import single_flight
 
 app = Flask(__name__)
-CORS(app)
+install_flask_json(app)
+CORS(app, expose_headers=['ETag'])
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -35,25 +49,23 @@ def get_checkpoint_filename(url):
 def load_checkpoint(url):
     """Load existing checkpoint data"""
     checkpoint_file = get_checkpoint_filename(url)
+    pending = pending_checkpoint(checkpoint_file)
+    if pending is not None:
+        return pending
     if os.path.exists(checkpoint_file):
         try:
-            with open(checkpoint_file, 'r', encoding='utf-8') as f:
-                checkpoint = json.load(f)
-                logger.info(f"Loaded checkpoint with {len(checkpoint.get('processed_data', []))} existing records")
-                return checkpoint
+            checkpoint = read_checkpoint(checkpoint_file)
+            logger.info(f"Loaded checkpoint with {len(checkpoint.get('processed_data', []))} existing records")
+            return normalized_result(checkpoint)
+        except CheckpointCorrupt as e:
+            logger.error(f"Checkpoint {checkpoint_file} is corrupt, it will be reprocessed: {str(e)}")
         except Exception as e:
             logger.warning(f"Error loading checkpoint: {str(e)}")
     return None
 
-def save_checkpoint(url, data):
-    """Save checkpoint data"""
-    checkpoint_file = get_checkpoint_filename(url)
-    try:
-        with open(checkpoint_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        logger.info(f"Checkpoint saved: {checkpoint_file}")
-    except Exception as e:
-        logger.error(f"Error saving checkpoint: {str(e)}")
+def save_checkpoint(url, data, lock=None):
+    """Queue checkpoint data for the background writer, which releases lock once it is written"""
+    schedule_write(get_checkpoint_filename(url), data, lock=lock)
 
 def get_last_processed_timestamp(checkpoint):
     """Get the latest timestamp from processed data"""
@@ -199,7 +211,7 @@ def is_negative_feedback(text, rating=None):
             sentiment_result['confidence'] > 0.6) or \
            sentiment_result['combined_score'] < -0.3
 
-def process_dataframe_incremental(df, url):
+def process_dataframe_incremental(df, url, lock=None):
     try:
         checkpoint = load_checkpoint(url)
         last_processed = get_last_processed_timestamp(checkpoint) if checkpoint else None
@@ -224,7 +236,8 @@ def process_dataframe_incremental(df, url):
             'Anything you want to convey': [
                 'additional_comments', 'comments', 'convey', 'additional_feedback',
                 'Anything you want to convey', 'Anything you want to convey?',''
-            ]
+            ],
+            'College Name': ['college', 'college_name', 'campus', 'Select the College', 'College']
         }
 
         # match columns
@@ -235,8 +248,13 @@ def process_dataframe_incremental(df, url):
                     standardized_columns[standard_name] = col
                     break
 
+        # Rows merged in before the College column was mapped have no college; rebuild them once
+        if checkpoint and 'College Name' in standardized_columns and any(
+                'college' not in entry for entry in checkpoint.get('all_data', checkpoint.get('processed_data', []))):
+            logger.info("Checkpoint rows have no college field, reprocessing all rows")
+            checkpoint, last_processed = None, None
+
         new_processed_data = []
-        new_flagged_entries = []
 
         for index, row in df.iterrows():
             try:
@@ -247,6 +265,7 @@ def process_dataframe_incremental(df, url):
                 instructor = row.get(standardized_columns.get('Select the Instructor', ''), '')
                 rating = row.get(standardized_columns.get('How do you rate Session', ''), 0)
                 additional_comments = row.get(standardized_columns.get('Anything you want to convey', ''), '')
+                college = row.get(standardized_columns.get('College Name', ''), '')
 
                 if not is_new_data(timestamp, last_processed):
                     continue
@@ -268,92 +287,43 @@ def process_dataframe_incremental(df, url):
                     'sentiment_score': sentiment_result['combined_score'],
                     'is_flagged': is_flagged
                 }
+                # College filters match on this field, so it is set whenever the sheet has the column
+                if 'College Name' in standardized_columns:
+                    processed_entry['college'] = college
                 new_processed_data.append(processed_entry)
 
-                if is_flagged:
-                    new_flagged_entries.append({
-                        'student_name': student_name,
-                        'instructor': instructor,
-                        'feedback': feedback_text,
-                        'rating': processed_entry['rating'],
-                        'sentiment': sentiment_result['sentiment'],
-                        'confidence': sentiment_result['confidence'],
-                        'timestamp': timestamp
-                    })
-
             except Exception as e:
                 logger.warning(f"Error processing row {index}: {str(e)}")
                 continue
 
-        existing_data = checkpoint.get('processed_data', []) if checkpoint else []
+        existing_data = checkpoint.get('all_data', checkpoint.get('processed_data', [])) if checkpoint else []
         all_processed_data = merge_data(existing_data, new_processed_data)
+        added_data = all_processed_data[len(existing_data):] if existing_data else all_processed_data
 
-        existing_flagged = checkpoint.get('flagged_entries', []) if checkpoint else []
-        all_flagged_entries = merge_data(existing_flagged, new_flagged_entries)
+        # Stored flagged row ids are already in order and rows are only appended, so only the new rows' ids are merged in
+        existing_flagged = checkpoint.get('flagged_row_ids') if checkpoint and existing_data else []
+        if existing_flagged is None:
+            existing_flagged = flagged_order_ids(existing_data)
+        offset = len(all_processed_data) - len(added_data)
+        flagged_row_ids = merge_flagged_ids(all_processed_data, existing_flagged,
+                                            [offset + position for position in flagged_order_ids(added_data)])
 
         total_responses = len(all_processed_data)
         if total_responses == 0:
             raise ValueError("No valid data found to process")
 
-        sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0}
-        total_rating = 0
-        valid_ratings = 0
-
-        for entry in all_processed_data:
-            sentiment_counts[entry['sentiment']] += 1
-            if entry['rating'] > 0:
-                total_rating += entry['rating']
-                valid_ratings += 1
-
-        average_rating = total_rating / valid_ratings if valid_ratings > 0 else 0
-
-        instructor_stats = {}
-        for entry in all_processed_data:
-            instructor = entry['instructor']
-            if instructor not in instructor_stats:
-                instructor_stats[instructor] = {
-                    'total_responses': 0,
-                    'total_rating': 0,
-                    'valid_ratings': 0,
-                    'negative_count': 0,
-                    'sentiment_scores': []
-                }
-
-            stats = instructor_stats[instructor]
-            stats['total_responses'] += 1
-            if entry['rating'] > 0:
-                stats['total_rating'] += entry['rating']
-                stats['valid_ratings'] += 1
-            if entry['sentiment'] == 'negative':
-                stats['negative_count'] += 1
-            stats['sentiment_scores'].append(entry['sentiment_score'])
-
-        formatted_instructor_stats = []
-        for instructor, stats in instructor_stats.items():
-            avg_rating = stats['total_rating'] / stats['valid_ratings'] if stats['valid_ratings'] > 0 else 0
-            avg_sentiment = sum(stats['sentiment_scores']) / len(stats['sentiment_scores']) if stats['sentiment_scores'] else 0
-
-            formatted_instructor_stats.append({
-                'instructor': instructor,
-                'total_responses': stats['total_responses'],
-                'average_rating': round(avg_rating, 2),
-                'negative_count': stats['negative_count'],
-                'sentiment_score': round(avg_sentiment, 3)
-            })
-
-        formatted_instructor_stats.sort(key=lambda x: (-x['negative_count'], x['average_rating']))
+        # Running aggregates: merged rows are only ever appended, so only those are applied
+        if checkpoint and existing_data and aggregates_match(checkpoint.get('aggregates'), existing_data):
+            aggregates = apply_rows(copy_aggregates(checkpoint['aggregates']), added=added_data)
+        else:
+            aggregates = build_aggregates(all_processed_data)
 
         result = {
-            'summary': {
-                'total_responses': total_responses,
-                'negative_count': sentiment_counts['negative'],
-                'positive_count': sentiment_counts['positive'],
-                'neutral_count': sentiment_counts['neutral'],
-                'average_rating': round(average_rating, 2)
-            },
-            'instructor_stats': formatted_instructor_stats,
-            'flagged_entries': sorted(all_flagged_entries, key=lambda x: x['confidence'], reverse=True),
+            'summary': summary_from_aggregates(aggregates),
+            'instructor_stats': instructor_stats_from_aggregates(aggregates),
+            'flagged_row_ids': flagged_row_ids,
             'all_data': all_processed_data,
+            'aggregates': aggregates,
             'processing_info': {
                 'new_records_processed': len(new_processed_data),
                 'total_records': total_responses,
@@ -361,7 +331,7 @@ def process_dataframe_incremental(df, url):
                 'incremental': True
             }
         }
-        save_checkpoint(url, result)
+        save_checkpoint(url, result, lock)
         return result
     except Exception as e:
         logger.error(f"Error in process_dataframe_incremental: {str(e)}")
@@ -386,8 +356,14 @@ def process_sheets_data(url):
         # Convert to DataFrame
         df = pd.DataFrame(data)
         
-        # Use incremental processing
-        return process_dataframe_incremental(df, url)
+        # Use incremental processing; the checkpoint is read, merged and rewritten under its lock,
+        # which the checkpoint writer releases once the merged checkpoint is on disk
+        lock = checkpoint_lock(get_checkpoint_filename(url)).acquire()
+        try:
+            return process_dataframe_incremental(df, url, lock)
+        except Exception:
+            lock.release()
+            raise
         
     except requests.exceptions.RequestException as e:
         logger.error(f"Error fetching Google Sheets data: {str(e)}")
@@ -411,155 +387,158 @@ def process_csv_data(csv_content):
         logger.error(f"Error processing CSV data: {str(e)}")
         raise Exception(f"Failed to process CSV data: {str(e)}")
 
-def process_dataframe(df):
-    try:
-        # ✅ same expanded mapping here too
-        column_mapping = {
-            'Timestamp': ['timestamp', 'date', 'time'],
-            'Email Address': ['email', 'email_address', 'student_email', 'Email Address'],
-            'Student Name': ['student_name', 'name', 'student', 'Student Name'],
-            'How do you feel about the session': [
-                'session_feedback', 'feedback', 'session_feeling', 'how_do_you_feel',
-                'How do you feel about the session', 'How do you feel about the session?'
-            ],
-            'Select the Instructor': [
-                'instructor', 'teacher', 'instructor_name',
-                'Select the Instructor', 'Select the instructor'
-            ],
-            'How do you rate Session': [
-                'rating', 'session_rating', 'score',
-                'How do you rate Session', 'How do you rate the session', 'How do you rate the session?'
-            ],
-            'Anything you want to convey': [
-                'additional_comments', 'comments', 'convey', 'additional_feedback',
-                'Anything you want to convey', 'Anything you want to convey?'
-            ]
-        }
-
-        standardized_columns = {}
-        for standard_name, possible_names in column_mapping.items():
-            for col in df.columns:
-                if col == standard_name or col.strip().lower() in [name.strip().lower() for name in possible_names]:
-                    standardized_columns[standard_name] = col
-                    break
+def iter_processed_rows(df):
+    """Score a DataFrame one row at a time, yielding processed entries"""
+    # ✅ same expanded mapping here too
+    column_mapping = {
+        'Timestamp': ['timestamp', 'date', 'time'],
+        'Email Address': ['email', 'email_address', 'student_email', 'Email Address'],
+        'Student Name': ['student_name', 'name', 'student', 'Student Name'],
+        'How do you feel about the session': [
+            'session_feedback', 'feedback', 'session_feeling', 'how_do_you_feel',
+            'How do you feel about the session', 'How do you feel about the session?'
+        ],
+        'Select the Instructor': [
+            'instructor', 'teacher', 'instructor_name',
+            'Select the Instructor', 'Select the instructor'
+        ],
+        'How do you rate Session': [
+            'rating', 'session_rating', 'score',
+            'How do you rate Session', 'How do you rate the session', 'How do you rate the session?'
+        ],
+        'Anything you want to convey': [
+            'additional_comments', 'comments', 'convey', 'additional_feedback',
+            'Anything you want to convey', 'Anything you want to convey?'
+        ],
+        'College Name': ['college', 'college_name', 'campus', 'Select the College', 'College']
+    }
 
-        processed_data = []
-        flagged_entries = []
+    standardized_columns = {}
+    for standard_name, possible_names in column_mapping.items():
+        for col in df.columns:
+            if col == standard_name or col.strip().lower() in [name.strip().lower() for name in possible_names]:
+                standardized_columns[standard_name] = col
+                break
 
-        for index, row in df.iterrows():
-            try:
-                timestamp = row.get(standardized_columns.get('Timestamp', ''), '')
-                email = row.get(standardized_columns.get('Email Address', ''), '')
-                student_name = row.get(standardized_columns.get('Student Name', ''), '')
-                feedback_text = row.get(standardized_columns.get('How do you feel about the session', ''), '')
-                instructor = row.get(standardized_columns.get('Select the Instructor', ''), '')
-                rating = row.get(standardized_columns.get('How do you rate Session', ''), 0)
-                additional_comments = row.get(standardized_columns.get('Anything you want to convey', ''), '')
+    for index, row in df.iterrows():
+        try:
+            timestamp = row.get(standardized_columns.get('Timestamp', ''), '')
+            email = row.get(standardized_columns.get('Email Address', ''), '')
+            student_name = row.get(standardized_columns.get('Student Name', ''), '')
+            feedback_text = row.get(standardized_columns.get('How do you feel about the session', ''), '')
+            instructor = row.get(standardized_columns.get('Select the Instructor', ''), '')
+            rating = row.get(standardized_columns.get('How do you rate Session', ''), 0)
+            additional_comments = row.get(standardized_columns.get('Anything you want to convey', ''), '')
+            college = row.get(standardized_columns.get('College Name', ''), '')
+
+            analysis_text = str(feedback_text).strip()
+            sentiment_result = analyze_sentiment(analysis_text)
+            is_flagged = is_negative_feedback(analysis_text, rating)
+
+            processed_entry = {
+                'timestamp': timestamp,
+                'email': email,
+                'student_name': student_name,
+                'session_feedback': feedback_text,
+                'instructor': instructor,
+                'rating': float(rating) if rating and str(rating).replace('.', '').isdigit() else 0,
+                'additional_comments': additional_comments,
+                'sentiment': sentiment_result['sentiment'],
+                'confidence': sentiment_result['confidence'],
+                'sentiment_score': sentiment_result['combined_score'],
+                'is_flagged': is_flagged
+            }
+            if 'College Name' in standardized_columns:
+                processed_entry['college'] = college
+        except Exception as e:
+            logger.warning(f"Error processing row {index}: {str(e)}")
+            continue
+        yield processed_entry
 
-                analysis_text = str(feedback_text).strip()
-                sentiment_result = analyze_sentiment(analysis_text)
-                is_flagged = is_negative_feedback(analysis_text, rating)
+def iter_csv_rows(csv_content, chunksize=500):
+    """Parse and score CSV content in chunks so streaming exports stay flat in memory"""
+    for chunk in pd.read_csv(io.StringIO(csv_content), chunksize=chunksize):
+        yield from iter_processed_rows(chunk)
 
-                processed_entry = {
-                    'timestamp': timestamp,
-                    'email': email,
-                    'student_name': student_name,
-                    'session_feedback': feedback_text,
-                    'instructor': instructor,
-                    'rating': float(rating) if rating and str(rating).replace('.', '').isdigit() else 0,
-                    'additional_comments': additional_comments,
-                    'sentiment': sentiment_result['sentiment'],
-                    'confidence': sentiment_result['confidence'],
-                    'sentiment_score': sentiment_result['combined_score'],
-                    'is_flagged': is_flagged
-                }
-                processed_data.append(processed_entry)
-
-                if is_flagged:
-                    flagged_entries.append({
-                        'student_name': student_name,
-                        'instructor': instructor,
-                        'feedback': feedback_text,
-                        'rating': processed_entry['rating'],
-                        'sentiment': sentiment_result['sentiment'],
-                        'confidence': sentiment_result['confidence'],
-                        'timestamp': timestamp
-                    })
-            except Exception as e:
-                logger.warning(f"Error processing row {index}: {str(e)}")
-                continue
+def process_dataframe(df):
+    try:
+        processed_data = list(iter_processed_rows(df))
 
         total_responses = len(processed_data)
         if total_responses == 0:
             raise ValueError("No valid data found to process")
 
-        sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0}
-        total_rating = 0
-        valid_ratings = 0
-
-        for entry in processed_data:
-            sentiment_counts[entry['sentiment']] += 1
-            if entry['rating'] > 0:
-                total_rating += entry['rating']
-                valid_ratings += 1
-
-        average_rating = total_rating / valid_ratings if valid_ratings > 0 else 0
-
-        instructor_stats = {}
-        for entry in processed_data:
-            instructor = entry['instructor']
-            if instructor not in instructor_stats:
-                instructor_stats[instructor] = {
-                    'total_responses': 0,
-                    'total_rating': 0,
-                    'valid_ratings': 0,
-                    'negative_count': 0,
-                    'sentiment_scores': []
-                }
-            stats = instructor_stats[instructor]
-            stats['total_responses'] += 1
-            if entry['rating'] > 0:
-                stats['total_rating'] += entry['rating']
-                stats['valid_ratings'] += 1
-            if entry['sentiment'] == 'negative':
-                stats['negative_count'] += 1
-            stats['sentiment_scores'].append(entry['sentiment_score'])
-
-        formatted_instructor_stats = []
-        for instructor, stats in instructor_stats.items():
-            avg_rating = stats['total_rating'] / stats['valid_ratings'] if stats['valid_ratings'] > 0 else 0
-            avg_sentiment = sum(stats['sentiment_scores']) / len(stats['sentiment_scores']) if stats['sentiment_scores'] else 0
-
-            formatted_instructor_stats.append({
-                'instructor': instructor,
-                'total_responses': stats['total_responses'],
-                'average_rating': round(avg_rating, 2),
-                'negative_count': stats['negative_count'],  # ✅ added here
-                'sentiment_score': round(avg_sentiment, 3)
-            })
-
-        formatted_instructor_stats.sort(key=lambda x: (-x['negative_count'], x['average_rating']))
+        aggregates = build_aggregates(processed_data)
 
         return {
-            'summary': {
-                'total_responses': total_responses,
-                'negative_count': sentiment_counts['negative'],
-                'positive_count': sentiment_counts['positive'],
-                'neutral_count': sentiment_counts['neutral'],
-                'average_rating': round(average_rating, 2)
-            },
-            'instructor_stats': formatted_instructor_stats,
-            'flagged_entries': sorted(flagged_entries, key=lambda x: x['confidence'], reverse=True),
+            'summary': summary_from_aggregates(aggregates),
+            'instructor_stats': instructor_stats_from_aggregates(aggregates),
+            'flagged_row_ids': flagged_order_ids(processed_data),
             'all_data': processed_data
         }
     except Exception as e:
         logger.error(f"Error in process_dataframe: {str(e)}")
         raise Exception(f"Failed to process data: {str(e)}")
 
+@app.after_request
+def compress_json_response(response):
+    """gzip/brotli-encode large JSON responses when the client accepts it"""
+    if (response.direct_passthrough or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers):
+        return response
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+    body = response.get_data()
+    if not encoding or len(body) < GZIP_MIN_BYTES:
+        return response
+    response.set_data(compress_body(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    if 'ETag' in response.headers:
+        response.headers['ETag'] = encoded_etag(response.headers['ETag'], encoding)
+    return response
+
+def request_filters():
+    """Row filters from the query string, JSON body or form of a feedback request"""
+    body = request.get_json(silent=True) or {}
+    def value(name):
+        return request.args.get(name) or body.get(name) or request.form.get(name)
+    return parse_filters(value('startDate'), value('endDate'), value('instructor'),
+                         value('sentiment'), value('college'))
+
+def request_row_encoding():
+    """Field projection and row encoding options from the query string"""
+    encoding = request.args.get('encoding', 'rows')
+    if encoding not in ENCODINGS:
+        raise ValueError(f"encoding must be one of {', '.join(ENCODINGS)}")
+    precision = request.args.get('precision')
+    if precision is not None:
+        if not precision.isdigit() or int(precision) > 10:
+            raise ValueError('precision must be an integer between 0 and 10')
+        precision = int(precision)
+    fields = parse_fields(request.args.get('fields'))
+    if fields is None and encoding == 'rows' and precision is None:
+        return {}
+    return {'fields': fields, 'encoding': encoding, 'precision': precision}
+
+def render_result(result, filters, encoding):
+    """Apply request filters, the requested view and row encoding to a processed result"""
+    if filters:
+        result = filtered_result(FeedbackIndex(result['all_data'], result.get('processing_info')), filters)
+    if request.args.get('view') == 'summary':
+        return summary_view(result)
+    result = public_result(result)
+    # flagged=ids sends flagged rows as positions in all_data instead of copies
+    if request.args.get('flagged') != 'ids':
+        result = compat_result(result)
+    if encoding:
+        result = dict(result, all_data=encode_rows(result['all_data'], **encoding))
+    return result
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat(),
+                    'checkpoint_writer': writer_stats()})
 
 @app.route('/process-sheets', methods=['POST'])
 def process_sheets():
@@ -578,13 +557,20 @@ def process_sheets():
         if not (url.startswith('http://') or url.startswith('https://')):
             return jsonify({'error': 'Invalid URL format'}), 400
         
+        try:
+            filters = request_filters()
+            encoding = request_row_encoding()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         logger.info(f"Processing Google Sheets URL: {url}")
         
-        result = process_sheets_data(url)
+        # Concurrent requests for the same sheet share one run; gunicorn workers take turns on the checkpoint lock
+        result = single_flight(f"sheet:{url}", lambda: process_sheets_data(url))
         
         logger.info(f"Successfully processed {result['processing_info']['new_records_processed']} new records from {result['summary']['total_responses']} total responses")
         
-        return jsonify(result)
+        return jsonify(render_result(result, filters, encoding))
         
     except Exception as e:
         logger.error(f"Error in process_sheets: {str(e)}")
@@ -611,18 +597,93 @@ def process_csv():
         if not csv_content.strip():
             return jsonify({'error': 'CSV file is empty'}), 400
         
+        try:
+            filters = request_filters()
+            encoding = request_row_encoding()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        export_format = request.args.get('format')
+        if export_format:
+            if export_format not in EXPORT_FORMATS:
+                return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+            
+            # Stream rows out as they are scored instead of building the full result
+            logger.info(f"Streaming {export_format} export for CSV file: {file.filename}")
+            rows = (row for row in iter_csv_rows(csv_content) if row_matches(row, filters))
+            return Response(stream_with_context(iter_export(rows, export_format, encoding.get('fields'))),
+                            content_type=MEDIA_TYPES[export_format])
+        
         logger.info(f"Processing CSV file: {file.filename}")
         
-        result = process_csv_data(csv_content)
+        csv_hash = hashlib.sha256(csv_content.encode('utf-8')).hexdigest()
+        result = single_flight(f"csv:{csv_hash}", lambda: process_csv_data(csv_content))
         
         logger.info(f"Successfully processed {result['summary']['total_responses']} responses from CSV")
         
-        return jsonify(result)
+        return jsonify(render_result(result, filters, encoding))
         
     except Exception as e:
         logger.error(f"Error in process_csv: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/rows', methods=['GET'])
+def get_rows():
+    """Page through the checkpointed rows for a Google Sheets URL"""
+    try:
+        url = request.args.get('url', '').strip()
+        if not url:
+            return jsonify({'error': 'URL is required'}), 400
+        
+        try:
+            limit = int(request.args.get('limit', 100))
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        if not 1 <= limit <= 1000:
+            return jsonify({'error': 'limit must be between 1 and 1000'}), 400
+        
+        try:
+            filters = request_filters()
+            encoding = request_row_encoding()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        checkpoint_file = get_checkpoint_filename(url)
+        version = checkpoint_version(checkpoint_file)
+        etag = None
+        if version is not None:
+            variant = '&'.join(sorted(f'{k}={v}' for k, v in request.args.items(multi=True)))
+            etag = make_etag(f'/rows|{checkpoint_file}', version, variant)
+            if etag_matches(request.headers.get('If-None-Match'), etag):
+                return Response(status=304, headers={'ETag': etag, 'Vary': 'Accept-Encoding'})
+        
+        index = get_index(checkpoint_file, version, lambda: load_checkpoint(url))
+        if index is None:
+            return jsonify({'error': 'No checkpoint found for this URL'}), 404
+        
+        try:
+            page = index.page(
+                sort=request.args.get('sort', 'timestamp'),
+                order=request.args.get('order', 'desc'),
+                cursor=request.args.get('cursor') or None,
+                limit=limit,
+                filters=filters
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if encoding:
+            page['rows'] = encode_rows(page['rows'], **encoding)
+        page['url'] = url
+        response = jsonify(page)
+        if etag:
+            response.headers['ETag'] = etag
+        return response
+        
+    except Exception as e:
+        logger.error(f"Error in get_rows: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/process-multiple-sheets', methods=['POST'])
 def process_multiple_sheets():
     """Process multiple Google Sheets with separate incremental processing"""
@@ -657,7 +718,7 @@ def process_multiple_sheets():
                 results[sheet_id] = {
                     'url': url,
                     'status': 'success',
-                    'data': result,
+                    'data': compat_result(public_result(result)),
                     'processing_info': {
                         'new_records_processed': result['processing_info']['new_records_processed'],
                         'total_records': result['summary']['total_responses'],
@@ -727,8 +788,7 @@ def list_checkpoints():
                 if filename.startswith('checkpoint_') and filename.endswith('.json'):
                     checkpoint_file = os.path.join(CHECKPOINT_DIR, filename)
                     try:
-                        with open(checkpoint_file, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
+                        data = read_checkpoint(checkpoint_file)
                             
                         # Extract URL from checkpoint data if available
                         url = data.get('url', 'Unknown URL')
@@ -769,6 +829,8 @@ def clear_all_checkpoints():
     """Clear all checkpoint data"""
     try:
         cleared_count = 0
+        # Drop queued writes first so none of them brings a cleared checkpoint back
+        discard_pending()
         
         if os.path.exists(CHECKPOINT_DIR):
             for filename in os.listdir(CHECKPOINT_DIR):
@@ -806,8 +868,7 @@ def get_checkpoint_info():
             return jsonify({'error': 'No checkpoint found for this URL'})
         
         try:
-            with open(checkpoint_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = read_checkpoint(checkpoint_file)
             
             # Get file stats
             file_stats = os.stat(checkpoint_file)
@@ -827,7 +888,7 @@ def get_checkpoint_info():
                     },
                     'average_rating': data.get('summary', {}).get('average_rating', 0),
                     'instructors_count': len(data.get('instructor_stats', [])),
-                    'flagged_entries': len(data.get('flagged_entries', []))
+                    'flagged_entries': len(data.get('flagged_row_ids', data.get('flagged_entries', [])))
                 },
                 'processing_info': data.get('processing_info', {})
             })
@@ -851,11 +912,15 @@ def clear_checkpoint():
         
         url = data['url'].strip()
         checkpoint_file = get_checkpoint_filename(url)
+        discarded = discard_pending(checkpoint_file)
         
         if os.path.exists(checkpoint_file):
             os.remove(checkpoint_file)
             logger.info(f"Checkpoint cleared for URL: {url}")
             return jsonify({'message': 'Checkpoint cleared successfully'})
+        elif discarded:
+            logger.info(f"Discarded queued checkpoint write for URL: {url}")
+            return jsonify({'message': 'Checkpoint cleared successfully'})
         else:
             return jsonify({'message': 'No checkpoint found for this URL'})
         